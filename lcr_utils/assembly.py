@@ -9,171 +9,675 @@ To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
 '''
 # pylint: disable=too-many-arguments
 from _collections import defaultdict
-import csv
-from itertools import cycle
+import hashlib
+import json
 import os
 from shutil import rmtree
 
-from synbiochem.utils import plate_utils
+import numpy as np
 
+from lcr_utils import domino, robot, worklist as wl
 from lcr_utils.build import BuildGenieBase
+from lcr_utils.layout import PLATE_FORMATS, PlateLayout
+from lcr_utils.output import OutputWriter
+from lcr_utils.protocol import get_transfers
 
 
 _AMPLIGASE = 'ampligase'
 _LCR_MASTERMIX = 'lgr-mastermix'
 _WATER = 'water'
 
-_WORKLIST_COLS = ['DestinationPlateBarcode',
-                  'DestinationPlateWell',
-                  'SourcePlateBarcode',
-                  'SourcePlateWell',
-                  'Volume',
-                  'ComponentName',
-                  'description',
-                  'ice_id',
-                  'plasmid_id']
+# Query parameters that change outputs, hashed for incremental runs:
+_LAYOUT_PARAMS = ['plate_format', 'rows', 'cols', 'channels', 'seqs',
+                  'ordering', 'well_volume', 'dead_volume', 'table_format',
+                  'validate', 'share_pools', 'replicate', 'stream']
+
+_MANIFEST = 'manifest.json'
 
 
 class AssemblyThread(BuildGenieBase):
     '''Class implementing AssemblyGenie algorithms.'''
 
-    def __init__(self, query, outdir='assembly'):
+    def __init__(self, query, outdir='assembly', protocol=None):
         super(AssemblyThread, self).__init__(query)
-        self.__rows = self._query.get('rows', 8)
-        self.__cols = self._query.get('cols', 12)
+        self.__protocol = protocol or self._query['protocol']
+        # Plate format, e.g. 384, sets default rows and columns:
+        rows, cols = PLATE_FORMATS[self._query.get('plate_format', 96)]
+        self.__rows = self._query.get('rows', rows)
+        self.__cols = self._query.get('cols', cols)
+
+        # Wells fill in blocks aligned to a multichannel head of channels:
+        self.__channels = self._query.get('channels', 8)
+        self.__layout = PlateLayout(self.__rows, self.__cols,
+                                    self.__channels)
+        self.__ordering = self._query.get('ordering', 'round_robin')
+        self.__share_pools = self._query.get('share_pools', False)
+
+        # Components drawn at least this many times are replicated down a
+        # column, one well per channel, so multichannel heads aspirate
+        # together:
+        self.__replicate = self._query.get('replicate', None)
+        self.__replicas = set()
+        self.__well_names = self.__layout.get_well_names()
+
+        # Optional worklist tables for LIMS ingestion, parquet or arrow:
+        self.__table_format = self._query.get('table_format', None)
+
+        # Optional domino validation, e.g. {'min_tm': 65, 'max_tm': 75}:
+        self.__validate = self._query.get('validate', None)
+
+        # Source well usable volume, if wells are allocated by volume drawn:
+        self.__well_capacity = \
+            self._query['well_volume'] - self._query.get('dead_volume', 0) \
+            if 'well_volume' in self._query else None
+
+        self.__num_wells = {}
+        self.__fill = {}
         self.__outdir = outdir
+        self.__chunk_id = None
+        self.__incremental = self._query.get('incremental', False)
         self._comp_well = {}
 
-        if os.path.exists(self.__outdir):
+        # Incremental runs keep outputs only if a manifest records them:
+        if os.path.exists(self.__outdir) and \
+                (not self.__incremental or
+                 not os.path.exists(os.path.join(self.__outdir, _MANIFEST))):
             rmtree(self.__outdir)
 
-        os.mkdir(self.__outdir)
+        if not os.path.exists(self.__outdir):
+            os.mkdir(self.__outdir)
 
-    def _write_dom_pool_worklist(self, pools, dest_plate_id, vol):
-        '''Write domino pool worklist.'''
-        self._write_worklist_header(dest_plate_id)
+        self.__output = OutputWriter(self.__outdir, self.__table_format)
 
-        comp_well = {}
-        worklist = []
+    def run(self):
+        '''Exports recipes, publishing outputs only if all succeed.'''
+        try:
+            if self._query.get('stream', False) or self.__incremental:
+                self.__run_chunked()
+            else:
+                self._run()
+        except BaseException:
+            self.__output.abort()
+            raise
+
+        self.__output.close()
+
+        summary = self._stats.get_summary()
+
+        with open(os.path.join(self.__outdir, 'summary.json'), 'w') \
+                as out_file:
+            json.dump(summary, out_file, indent=2, sort_keys=True)
+
+        self._fire_event({'update': {'status': 'finished',
+                                     'message': 'Finished',
+                                     'summary': summary}})
+
+    def _run(self):
+        '''Writes plates and worklists of protocol.'''
+        pools = self._get_graph().get_pools()
+
+        if self.__validate is not None:
+            with self._stats.stage('validate'):
+                self.__validate_dominoes(pools)
+
+        steps = []
+        pool_groups = {}
+
+        for step in self.__protocol['steps']:
+            steps.append(self.__get_transfers(step, pools, pool_groups))
+
+            if 'pool' in step:
+                pool_groups[step['pool']] = steps[-1][3]
+
+        self.__replicas = self.__get_replicas(steps) \
+            if self.__replicate is not None else set()
+
+        if self.__well_capacity is not None:
+            # Draws exceeding a source well are split over successive wells:
+            steps = [(step, [_split(block, self.__well_capacity)
+                             for block in blocks], dest_ids, groups)
+                     for step, blocks, dest_ids, groups in steps]
+            self.__num_wells = self.__get_num_source_wells(steps)
+
+        self.__fill = {}
+
+        # Write plates:
+        with self._stats.stage('plates'):
+            for plate_id, reagents in self.__protocol['plates']:
+                components = [[reagent] for reagent in reagents]
+
+                if plate_id == self.__protocol.get('parts_plate'):
+                    components = self._get_components() + components
+
+                self._comp_well.update(self._write_plate(plate_id,
+                                                         components))
+
+        # Write worklists:
+        for step, blocks, dest_ids, groups in steps:
+            with self._stats.stage(step['id']):
+                self.__write_step(step, blocks, dest_ids, groups)
+
+    def __get_transfers(self, step, pools, pool_groups):
+        '''Gets step's transfers, destination plasmid ids and map of
+        construct to destination. If pools are shared, constructs with
+        identical pools share one destination, its volumes scaled up if
+        required to supply all of them.'''
+        if not self.__share_pools or 'pool' not in step:
+            return step, get_transfers(step, pools, self._ice_ids), \
+                self._ice_ids, np.arange(len(self._ice_ids))
+
+        # Pool contents: parts, and destinations of pools consumed:
+        keys = [tuple([tuple(sorted(part.part_id
+                                    for part in pools[ice_id][key]))
+                       for key, _ in step.get('parts', [])] +
+                      [pool_groups[pool_id][idx] if pool_id in pool_groups
+                       else idx
+                       for pool_id, _ in step.get('pools', [])])
+                for idx, ice_id in enumerate(self._ice_ids)]
+
+        draw = sum(vol
+                   for later in self.__protocol['steps']
+                   for pool_id, vol in later.get('pools', [])
+                   if pool_id == step['pool'])
+        dead_volume = self._query.get('dead_volume', 0)
+
+        groups, dest_ids, blocks, supply = self.__get_groups(step, pools,
+                                                             keys)
+
+        if 'well_volume' in self._query:
+            # Split groups so that scaled pools fit their wells:
+            max_scale = np.maximum(
+                1, np.floor(self._query['well_volume'] / supply))
+            max_members = np.maximum(
+                1, (max_scale * supply - dead_volume) // draw).astype(int)
+            ranks = defaultdict(int)
+
+            for idx, group in enumerate(groups):
+                keys[idx] += (ranks[group] // max_members[group],)
+                ranks[group] += 1
+
+            groups, dest_ids, blocks, supply = self.__get_groups(step, pools,
+                                                                 keys)
+
+        # Scale pools drawn on by many constructs:
+        demand = np.bincount(groups) * draw + dead_volume
+        scale = np.maximum(1, np.ceil(demand / supply))
+
+        return step, [(kind, constructs, comps, vols * scale[constructs])
+                      for kind, constructs, comps, vols in blocks], \
+            dest_ids, groups
+
+    def __get_groups(self, step, pools, keys):
+        '''Groups constructs by key, returning groups, destination plasmid
+        ids, transfers and volume of each destination.'''
+        groups = np.zeros(len(keys), dtype=int)
+        key_group = {}
+
+        for idx, key in enumerate(keys):
+            groups[idx] = key_group.setdefault(key, len(key_group))
+
+        # Each destination is identified by its first construct:
+        dest_ids = [None] * len(key_group)
+
+        for ice_id, group in reversed(zip(self._ice_ids, groups)):
+            dest_ids[group] = ice_id
+
+        blocks = get_transfers(step, pools, dest_ids)
+        supply = sum(np.bincount(constructs, vols, len(dest_ids))
+                     for _, constructs, _, vols in blocks)
+
+        return groups, dest_ids, blocks, supply
+
+    def __validate_dominoes(self, pools):
+        '''Validates dominoes against their flanking parts, reporting any
+        flagged before worklists are written.'''
+        seqs = {entry[0]: entry[5] for entry in self.get_order()}
+        report = domino.validate(self._ice_ids, pools, seqs,
+                                 **self.__validate)
+        name = self.__get_plate_well('domino_validation', 0, 1)[1]
+        flagged = [entry[1] for entry in report if entry[-1]]
+
+        self.__output.writerow(name, domino.COLS)
+        self.__output.writerows(name, [['' if val is None
+                                        else '%.2f' % val
+                                        if isinstance(val, float)
+                                        else val
+                                        for val in entry]
+                                       for entry in report])
+        self._stats.add_rows(name, len(report))
+
+        self._fire_event({'update': {'status': 'running',
+                                     'message': 'Flagged %d of %d dominoes' %
+                                     (len(flagged), len(report)),
+                                     'flagged': flagged}})
+
+    def __get_replicas(self, steps):
+        '''Gets components drawn at least the replication threshold number
+        of times.'''
+        draws = defaultdict(int)
+
+        for _, blocks, _, _ in steps:
+            for kind, _, comps, _ in blocks:
+                if kind != 'pools':
+                    for comp in comps:
+                        draws[_get_source_id(kind, comp)] += 1
+
+        # Without well capacity, water already has a well per destination:
+        return {comp for comp, num in draws.iteritems()
+                if num >= self.__replicate and
+                (comp != _WATER or self.__well_capacity is not None)}
+
+    def __get_num_source_wells(self, steps):
+        '''Gets number of source wells needed per component, filling each
+        well (or, for replicated components, each channel's wells) up to
+        capacity in transfer order.'''
+        fill = {}
+
+        for _, blocks, _, _ in steps:
+            for kind, constructs, comps, vols in blocks:
+                if kind != 'pools':
+                    for dest_idx, comp, vol in zip(constructs, comps, vols):
+                        _fill(fill, self.__get_fill_id(
+                            _get_source_id(kind, comp), dest_idx), vol,
+                            self.__well_capacity)
+
+        num_wells = defaultdict(int)
+
+        for fill_id, state in fill.iteritems():
+            if isinstance(fill_id, tuple):
+                # Replicated component fills a well per channel:
+                num_wells[fill_id[0]] = max(
+                    num_wells[fill_id[0]],
+                    (state[0] + 1) * self.__layout.channels)
+            else:
+                num_wells[fill_id] = state[0] + 1
 
-        for dest_idx, ice_id in enumerate(sorted(pools)):
-            vol_dominoes = len(pools[ice_id]['dominoes']) * vol
+        return num_wells
 
-            # Add water:
-            well = self._comp_well[_WATER][dest_idx]
-            worklist.append([dest_plate_id, dest_idx, well[1],
-                             well[0], str(250 - vol_dominoes),
-                             _WATER, _WATER, '',
-                             ice_id])
+    def __get_fill_id(self, comp, dest_idx):
+        '''Gets id under which source well fill is tracked: component, or
+        component and channel for replicated components.'''
+        return (comp, self.__layout.get_channel(dest_idx)) \
+            if comp in self.__replicas else comp
 
-            for domino in pools[ice_id]['dominoes']:
-                src_well = self._comp_well[domino[1]]
+    def __get_source_well(self, comp, vol, dest_idx):
+        '''Gets source well of a transfer.'''
+        wells = self._comp_well[comp]
 
-                worklist.append([dest_plate_id, dest_idx, src_well[1],
-                                 src_well[0], str(vol),
-                                 domino[2], domino[5], domino[1],
-                                 ice_id])
+        if isinstance(wells[0], int):
+            return wells
 
-            comp_well[ice_id + '_domino_pool'] = (dest_idx, dest_plate_id, [])
+        if comp in self.__replicas:
+            # Draw from replica of destination's channel, head-aligned wells
+            # holding one replica per channel:
+            offset = _fill(self.__fill, self.__get_fill_id(comp, dest_idx),
+                           vol, self.__well_capacity) \
+                if self.__well_capacity is not None else 0
 
-        self._write_comp_wells(dest_plate_id, comp_well)
-        self._write_worklist(dest_plate_id, worklist)
-        return comp_well
+            return wells[offset * self.__layout.channels +
+                         self.__layout.get_channel(dest_idx)]
 
-    def _get_pools(self):
-        '''Get pools.'''
-        pools = defaultdict(lambda: defaultdict(list))
+        if self.__well_capacity is not None:
+            # Replays fill order of __get_num_source_wells:
+            return wells[_fill(self.__fill, comp, vol, self.__well_capacity)]
 
-        for ice_id in self._ice_ids:
-            data = self._get_data(ice_id)
+        return wells[dest_idx]
 
-            for part in data[0].get_metadata()['linkedParts']:
-                data = self._get_data(part['partId'])
+    def __write_step(self, step, blocks, dest_ids, groups):
+        '''Writes worklist of protocol step.'''
+        dest_plate_id = step['id']
+        self._write_worklist_header(dest_plate_id, len(dest_ids))
 
-                if data[4] == 'ORF':
-                    pools[ice_id]['parts'].append(data)
-                elif data[4] == 'DOMINO':
-                    pools[ice_id]['dominoes'].append(data)
-                else:
-                    # Assume backbone:
-                    pools[ice_id]['backbone'].append(data)
+        for kind, constructs, comps, vols in blocks:
+            ice_ids = [dest_ids[dest_idx] for dest_idx in constructs]
+            dests = [self._get_dest_well(dest_plate_id, dest_idx,
+                                         len(dest_ids))
+                     for dest_idx in constructs]
 
-        return pools
+            if kind == 'pools':
+                wells = [self._comp_well[ice_id + '_' + comp]
+                         for ice_id, comp in zip(ice_ids, comps)]
+            else:
+                wells = [self.__get_source_well(_get_source_id(kind, comp),
+                                                vol, dest_idx)
+                         for dest_idx, comp, vol
+                         in zip(constructs, comps, vols)]
+
+            names = [_get_names(kind, comp) for comp in comps]
+
+            self._write_worklist(wl.Worklist(
+                [dest[1] for dest in dests],
+                [dest[0] for dest in dests],
+                [well[1] for well in wells],
+                [well[0] for well in wells],
+                vols,
+                [name[0] for name in names],
+                [name[1] for name in names],
+                [name[2] for name in names],
+                ice_ids))
+
+        if 'pool' in step:
+            # Register destinations as pools for subsequent steps:
+            comp_well = {}
+
+            for ice_id, dest_idx in zip(self._ice_ids, groups):
+                dest_well, dest_plate = self._get_dest_well(dest_plate_id,
+                                                            dest_idx,
+                                                            len(dest_ids))
+                comp_well[ice_id + '_' + step['pool']] = \
+                    (dest_well, dest_plate, [])
+
+            self._write_comp_wells(comp_well)
+            self._comp_well.update(comp_well)
+
+    def __run_chunked(self):
+        '''Runs over chunks of ice_ids, publishing each chunk's plates and
+        releasing its data before the next chunk is fetched. Streamed
+        chunks are plate-sized, each with its own plates. Otherwise, all
+        ice_ids form one chunk, keeping the normal plate layout.
+
+        In incremental mode, chunks whose constructs and parameters are
+        unchanged since the previous run are left as they are. A changed
+        chunk is regenerated, but its output files whose contents are
+        unchanged are left untouched. Constructs are still resolved, to be
+        hashed, so unchanged re-runs are cheap only with a cache. Inserting
+        or removing constructs shifts later wells, and in streamed runs
+        later chunks, so all outputs downstream of the change are
+        rewritten.'''
+        ice_ids = self._ice_ids
+        chunk_size = self.__get_chunk_size() \
+            if self._query.get('stream', False) else max(1, len(ice_ids))
+        chunks = [ice_ids[idx:idx + chunk_size]
+                  for idx in range(0, len(ice_ids), chunk_size)]
+        manifest = self.__read_manifest()
+        new_manifest = {}
+
+        for chunk_idx, chunk in enumerate(chunks):
+            # Suffix plate ids with chunk number, e.g. lcr_1, lcr_2:
+            self.__chunk_id = chunk_idx + 1 if len(chunks) > 1 else None
+            self._set_ice_ids(chunk)
+            self._comp_well = {}
+
+            key = str(self.__chunk_id)
+            previous = manifest.pop(key, None)
+            hashes = self.__get_hashes() if self.__incremental else None
+
+            if previous and previous['hashes'] == hashes and \
+                    all(os.path.exists(os.path.join(self.__outdir, filename))
+                        for filename in previous['files']):
+                new_manifest[key] = previous
+                self._stats.add_rows('unchanged_constructs', len(chunk))
+                continue
+
+            self._run()
+            files = self.__output.close()
+
+            if previous:
+                self.__remove(set(previous['files']) - set(files))
+
+            new_manifest[key] = {'hashes': hashes, 'files': files}
+
+        # Remove outputs of chunks no longer present:
+        for previous in manifest.itervalues():
+            self.__remove(previous['files'])
+
+        if self.__incremental:
+            with open(os.path.join(self.__outdir, _MANIFEST), 'w') \
+                    as out_file:
+                json.dump(new_manifest, out_file, indent=2, sort_keys=True)
+
+        self.__chunk_id = None
+        self._set_ice_ids(ice_ids)
+
+    def __get_chunk_size(self):
+        '''Gets number of constructs per chunk: a plate, less the wells of
+        reagents sharing a plate with water, which takes a well per
+        construct.'''
+        reagents = [len(reagents) - 1
+                    for _, reagents in self.__protocol['plates']
+                    if _WATER in reagents]
+
+        return max(1, self.__rows * self.__cols - max(reagents + [0]))
+
+    def __get_hashes(self):
+        '''Gets content hashes of parameters and of each construct's
+        resolved parts, including their sequences if outputs contain
+        them.'''
+        pools = self._get_graph().get_pools()
+        params = [self.__protocol, self.__chunk_id,
+                  {key: self._query.get(key) for key in _LAYOUT_PARAMS}]
+        seqs = {row[0]: [row[5]] for row in self.get_order()} \
+            if self._query.get('seqs', False) or \
+            self.__validate is not None else {}
+
+        return [_get_hash(params)] + \
+            [[ice_id,
+              _get_hash([[part.get_order() + seqs.get(part.part_id, [])
+                          for part in pools[ice_id][key]]
+                         for key in sorted(pools[ice_id])])]
+             for ice_id in self._ice_ids]
+
+    def __read_manifest(self):
+        '''Reads manifest of previous incremental run, if any.'''
+        filename = os.path.join(self.__outdir, _MANIFEST)
+
+        if not self.__incremental or not os.path.exists(filename):
+            return {}
+
+        with open(filename) as in_file:
+            return json.load(in_file)
+
+    def __remove(self, filenames):
+        '''Removes stale outputs.'''
+        for filename in filenames:
+            filename = os.path.join(self.__outdir, filename)
+
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def _get_components(self):
+        '''Gets parts for component plate, with sequences only if the query
+        requests them.'''
+        if self._query.get('seqs', False):
+            return self.get_order()
+
+        return self._get_graph().get_order()
 
     def _write_plate(self, plate_id, components):
         '''Write plate.'''
         comp_well = self.__get_comp_well(plate_id, components)
-        self._write_comp_wells(plate_id, comp_well)
+        self._write_comp_wells(comp_well)
         return comp_well
 
-    def _write_worklist_header(self, dest_plate_id):
-        '''Write worklist.'''
-        worklist_id = dest_plate_id + '_worklist'
-        outfile = os.path.join(self.__outdir, worklist_id + '.csv')
-
-        writer = csv.writer(open(outfile, 'a+'))
-        writer.writerow(_WORKLIST_COLS)
+    def _get_dest_well(self, dest_plate_id, dest_idx, num_dests=None):
+        '''Maps destination index to destination well and (sharded) plate,
+        destinations defaulting to one per construct.'''
+        return self.__get_plate_well(
+            dest_plate_id, dest_idx,
+            len(self._ice_ids) if num_dests is None else num_dests)
 
-    def _write_worklist(self, dest_plate_id, worklist):
+    def _write_worklist_header(self, dest_plate_id, num_dests=None):
         '''Write worklist.'''
-        worklist_id = dest_plate_id + '_worklist'
-        outfile = os.path.join(self.__outdir, worklist_id + '.csv')
-
-        writer = csv.writer(open(outfile, 'a+'))
-        worklist_map = defaultdict(list)
-
-        for entry in sorted(worklist, key=lambda x: x[3]):
-            worklist_map[entry[1]].append(entry)
-
-        for idx in cycle(range(0, self.__rows * self.__cols)):
-            if worklist_map[idx]:
-                entry = worklist_map[idx].pop(0)
-                writer.writerow([plate_utils.get_well(val)
-                                 if idx == 1 or idx == 3
-                                 else str(val)
-                                 for idx, val in enumerate(entry)])
-
-            if not sum([len(lst) for lst in worklist_map.values()]):
-                break
+        if num_dests is None:
+            num_dests = len(self._ice_ids)
+
+        for dest_plate in sorted(set(
+                self._get_dest_well(dest_plate_id, dest_idx, num_dests)[1]
+                for dest_idx in range(num_dests))):
+            self.__output.writerow(dest_plate + '_worklist', wl.COLS)
+
+    def _write_worklist(self, worklist):
+        '''Write Worklist, one file per (sharded) destination plate.'''
+        with self._stats.stage('write_worklist'):
+            for dest_plate in sorted(set(worklist.dest_plates)):
+                plate_worklist = _round_robin(worklist.take(
+                    np.flatnonzero(worklist.dest_plates == dest_plate)))
+
+                if self.__ordering == 'robot':
+                    positions = self.__layout.get_positions()
+                    ordered = robot.get_ordered(plate_worklist, self.__rows,
+                                                positions, self.__channels)
+                    self._stats.add_robot_time(
+                        dest_plate + '_worklist',
+                        robot.get_time(plate_worklist, self.__rows,
+                                       positions, self.__channels),
+                        robot.get_time(ordered, self.__rows, positions,
+                                       self.__channels))
+                    plate_worklist = ordered
+
+                self.__output.writerows(
+                    dest_plate + '_worklist',
+                    plate_worklist.get_rows(self.__well_names))
+
+                if self.__table_format:
+                    self.__output.add_table(
+                        dest_plate + '_worklist',
+                        plate_worklist.get_table(self.__well_names))
+
+                self._stats.add_rows(dest_plate + '_worklist',
+                                     len(plate_worklist))
+
+    def __get_plate_well(self, plate_id, idx, num_wells):
+        '''Maps index to well and plate, sharding into plate_id_1,
+        plate_id_2, etc. if num_wells exceeds a single plate.'''
+        plate_size = self.__rows * self.__cols
+
+        if self.__chunk_id is not None:
+            plate_id = '%s_%d' % (plate_id, self.__chunk_id)
+
+        if num_wells <= plate_size:
+            return idx, plate_id
+
+        return idx % plate_size, '%s_%d' % (plate_id, idx // plate_size + 1)
 
     def __get_comp_well(self, plate_id, components):
         '''Gets component-well map.'''
         comp_well = {}
         well_idx = 0
+        num_wells = [self.__get_num_wells(comps[0]) for comps in components]
+        starts = []
 
-        for comps in components:
-            if comps[0] == _WATER:
-                # Special case: appears in many wells to optimise dispensing
-                # efficiency:
-                # Assumes water is first in components list.
-                comp_well[comps[0]] = [[idx, plate_id, comps[1:]]
-                                       for idx in range(len(self._ice_ids))]
+        for comps, num in zip(components, num_wells):
+            if comps[0] in self.__replicas:
+                # Replicas start at the top of a column:
+                well_idx = -(-well_idx // self.__rows) * self.__rows
 
-                well_idx = well_idx + len(self._ice_ids)
+            starts.append(well_idx)
+            well_idx = well_idx + num
 
-            else:
-                comp_well[comps[0]] = [well_idx, plate_id, comps[1:]]
+        for comps, num, start in zip(components, num_wells, starts):
+            wells = [list(self.__get_plate_well(plate_id, idx, well_idx)) +
+                     [comps[1:]]
+                     for idx in range(start, start + num)]
 
-                well_idx = well_idx + 1
+            # Water, and any component split over wells, maps to a list:
+            comp_well[comps[0]] = wells \
+                if num > 1 or comps[0] == _WATER or \
+                comps[0] in self.__replicas else wells[0]
 
         return comp_well
 
-    def _write_comp_wells(self, plate_id, comp_wells):
-        '''Write component-well map.'''
-        outfile = os.path.join(self.__outdir, plate_id + '.csv')
+    def __get_num_wells(self, comp):
+        '''Gets number of source wells of component.'''
+        if self.__well_capacity is not None:
+            return self.__num_wells.get(comp, 1)
 
-        writer = csv.writer(open(outfile, 'a+'))
-        for comp, wells in sorted(comp_wells.iteritems(),
-                                  key=lambda (_, v): v[0]):
+        if comp in self.__replicas:
+            return self.__layout.channels
 
-            if isinstance(wells[0], int):
-                self.__write_comp_well(writer, wells, comp)
-            else:
-                for well in wells:
-                    self.__write_comp_well(writer, well, comp)
-
-    def __write_comp_well(self, writer, well, comp):
-        '''Write line on component-well map.'''
-        writer.writerow([plate_utils.get_well(well[0], self.__rows,
-                                              self.__cols),
-                         comp] + [str(val) for val in well[2]])
+        # Special case: water appears in many wells to optimise dispensing
+        # efficiency:
+        return len(self._ice_ids) if comp == _WATER else 1
+
+    def _write_comp_wells(self, comp_wells):
+        '''Write component-well map, one file per (sharded) plate.'''
+        plate_wells = defaultdict(list)
+
+        for comp, wells in comp_wells.iteritems():
+            for well in [wells] if isinstance(wells[0], int) else wells:
+                plate_wells[well[1]].append((well, comp))
+
+        for plate_id in sorted(plate_wells):
+            self.__output.writerows(
+                plate_id,
+                [[self.__well_names[well[0]], comp] +
+                 [str(val) for val in well[2]]
+                 for well, comp in sorted(plate_wells[plate_id],
+                                          key=lambda x: (x[0][0], x[1]))])
+
+
+def _get_source_id(kind, comp):
+    '''Gets source component id of a transfer.'''
+    return _WATER if kind == 'water' \
+        else comp.part_id if kind == 'parts' \
+        else comp
+
+
+def _get_hash(content):
+    '''Gets content hash of JSON-serialisable content.'''
+    return hashlib.sha1(json.dumps(content, sort_keys=True)).hexdigest()
+
+
+def _get_names(kind, comp):
+    '''Gets ComponentName, description and ice_id columns of a transfer.'''
+    if kind == 'water':
+        return [_WATER, _WATER, '']
+
+    if kind == 'parts':
+        return [comp.name, comp.desc, comp.part_id]
+
+    if kind == 'pools':
+        return [comp.replace('_', ' ')] * 2 + ['']
+
+    return [comp, comp, '']
+
+
+def _fill(fill, comp, vol, capacity):
+    '''Draws vol of comp from its current well, moving to the next well if
+    capacity would be exceeded. Returns well offset.'''
+    state = fill.setdefault(comp, [0, 0.0])
+
+    if state[1] and state[1] + vol > capacity:
+        state[0] += 1
+        state[1] = 0.0
+
+    state[1] += vol
+
+    return state[0]
+
+
+def _split(block, capacity):
+    '''Splits block's transfers exceeding capacity into transfers of a full
+    well, then the remainder. Pools, drawn from destinations of earlier
+    steps, are not split.'''
+    kind, constructs, comps, vols = block
+    vols = np.asarray(vols, dtype=float)
+
+    if kind == 'pools' or not (vols > capacity).any():
+        return block
+
+    counts = np.maximum(1, np.ceil(vols / capacity)).astype(int)
+    idxs = np.repeat(np.arange(len(vols)), counts)
+
+    # Number of each piece within its transfer:
+    pieces = np.arange(len(idxs)) - np.repeat(np.cumsum(counts) - counts,
+                                              counts)
+
+    return kind, np.asarray(constructs)[idxs], [comps[idx] for idx in idxs], \
+        np.minimum(capacity, vols[idxs] - pieces * capacity)
+
+
+def _round_robin(worklist):
+    '''Orders Worklist by cycling through destination wells, taking
+    each destination's transfers in source well order.'''
+    # Stable sort by destination, then source well:
+    order = np.lexsort((worklist.src_wells, worklist.dest_wells))
+    dest_wells = worklist.dest_wells[order]
+
+    # Rank of each transfer amongst those to its destination:
+    starts = np.flatnonzero(np.r_[True, dest_wells[1:] != dest_wells[:-1]])
+    ranks = np.arange(len(order)) - \
+        np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+
+    # The nth transfer to every destination precedes any (n+1)th transfer:
+    return worklist.take(order[np.lexsort((dest_wells, ranks))])
@@ -0,0 +1,231 @@
+'''
+lcr (c) University of Manchester 2018
+
+lcr is licensed under the MIT License.
+
+To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
+
+@author:  neilswainston
+'''
+# pylint: disable=too-many-arguments
+from functools import partial
+import json
+from multiprocessing import Process, Queue
+import os
+import random
+import resource
+from shutil import rmtree
+import sys
+import tempfile
+import threading
+import time
+
+from synbiochem.utils.ice_utils import ICEEntry
+
+from lcr_utils import build, cache, order
+from lcr_utils.lcr import LcrThread
+from lcr_utils.phospho_lcr import PhosphoLcrThread
+
+
+_SIZES = [96, 384, 1536, 10000]
+
+
+class FakeICEClient(object):
+    '''In-process stand-in for ICEClient, serving a synthetic design with
+    injectable per-request latency.'''
+
+    def __init__(self, entries, latency, url=None, username=None,
+                 psswrd=None, group_names=None):
+        del url, username, psswrd, group_names
+        self.__entries = entries
+        self.__latency = latency
+        self.__num_requests = 0
+        self.__lock = threading.Lock()
+
+    def get_num_requests(self):
+        '''Gets number of requests served.'''
+        return self.__num_requests
+
+    def get_ice_entry(self, ice_id):
+        '''Gets an ICEEntry (metadata and sequence requests).'''
+        metadata = self._ICEClient__get_meta_data(ice_id)
+        self.__request()
+        return ICEEntry({'seq': self.__entries[ice_id][1]},
+                        metadata=metadata)
+
+    def _ICEClient__get_dna(self, ice_id):
+        '''Gets entry DNA (one request), as ICEClient does.'''
+        self.__request()
+        return {'seq': self.__entries[ice_id][1]}
+
+    def _ICEClient__get_meta_data(self, ice_id):
+        '''Gets entry metadata (one request), as ICEClient does.'''
+        self.__request()
+        return json.loads(self.__entries[ice_id][0])
+
+    def __request(self):
+        '''Simulates a round trip.'''
+        with self.__lock:
+            self.__num_requests += 1
+
+        if self.__latency:
+            time.sleep(self.__latency)
+
+
+def get_design(num_constructs, num_backbones=4, num_orfs=64,
+               num_dominoes=256, orfs_per_construct=3, seq_len=2000, seed=0):
+    '''Generates synthetic ICE entries and plasmid ice_ids.'''
+    rand = random.Random(seed)
+    entries = {}
+
+    def _add(part_id, typ, subtype, seq, linked_parts=()):
+        metadata = {'partId': part_id,
+                    'name': part_id + '_name',
+                    'type': typ,
+                    'shortDescription': part_id + ' [synthetic] - part',
+                    'hasSequence': True,
+                    'parameters': [{'name': 'Type', 'value': subtype}]
+                                  if subtype else [],
+                    'linkedParts': [{'partId': linked_part}
+                                    for linked_part in linked_parts]}
+
+        entries[part_id] = json.dumps(metadata), seq
+
+    def _seq(length):
+        return ''.join(rand.choice('ACGT') for _ in range(length))
+
+    backbones = ['BB%06d' % idx for idx in range(num_backbones)]
+    orfs = ['ORF%06d' % idx for idx in range(num_orfs)]
+    dominoes = ['DOM%06d' % idx for idx in range(num_dominoes)]
+
+    for part_id in backbones:
+        _add(part_id, 'PLASMID', None, _seq(seq_len))
+
+    for part_id in orfs:
+        _add(part_id, 'PART', 'ORF', _seq(seq_len))
+
+    for part_id in dominoes:
+        _add(part_id, 'PART', 'DOMINO', _seq(60))
+
+    ice_ids = []
+
+    for idx in range(num_constructs):
+        ice_id = 'PL%06d' % idx
+        constr_orfs = rand.sample(orfs, orfs_per_construct)
+        _add(ice_id, 'PLASMID', None, '',
+             [rand.choice(backbones)] + constr_orfs +
+             rand.sample(dominoes, orfs_per_construct + 1))
+        ice_ids.append(ice_id)
+
+    return entries, ice_ids
+
+
+def run_case(name, num_constructs, latency=0.0, query_params=None):
+    '''Runs one benchmark case in a child process, so that peak memory is
+    measured per case.'''
+    queue = Queue()
+    proc = Process(target=_run_case,
+                   args=(queue, name, num_constructs, latency,
+                         query_params or {}))
+    proc.start()
+    proc.join()
+
+    if proc.exitcode:
+        raise RuntimeError('Benchmark %s failed for %d constructs' %
+                           (name, num_constructs))
+
+    return queue.get()
+
+
+def _run_case(queue, name, num_constructs, latency, query_params):
+    '''Runs benchmark case.'''
+    entries, ice_ids = get_design(num_constructs)
+    client = FakeICEClient(entries, latency)
+    tmp_dir = tempfile.mkdtemp()
+    cache_dir = tempfile.mkdtemp()
+
+    # Every run starts cold, with no persistent cache shared between runs:
+    build.ICEClient = partial(get_client, client)
+    build.EntryCache = partial(cache.EntryCache,
+                               os.path.join(cache_dir, 'ice_cache.db'))
+
+    query = {'ice': {'url': 'fake', 'username': '', 'password': ''},
+             'ice_ids': ice_ids}
+    query.update(query_params)
+
+    cwd = os.getcwd()
+    os.chdir(tmp_dir)
+
+    try:
+        start = time.time()
+
+        if name == 'lcr':
+            LcrThread(query, outdir='out').run()
+        elif name == 'phospho_lcr':
+            PhosphoLcrThread(query, outdir='out').run()
+        else:
+            order.main(['fake', '', ''] + ice_ids)
+
+        wall_time = time.time() - start
+
+        queue.put({'name': name,
+                   'constructs': num_constructs,
+                   'latency': latency,
+                   'params': query_params,
+                   'wall_time': wall_time,
+                   'peak_memory_kb':
+                   resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                   'output_bytes': _get_size(tmp_dir),
+                   'ice_requests': client.get_num_requests()})
+    finally:
+        os.chdir(cwd)
+        rmtree(tmp_dir)
+        rmtree(cache_dir)
+
+
+def get_client(client, *args, **kwargs):
+    '''Returns shared FakeICEClient in place of ICEClient.'''
+    del args, kwargs
+    return client
+
+
+def _get_size(dirname):
+    '''Gets total size of files under dirname.'''
+    return sum(os.path.getsize(os.path.join(root, filename))
+               for root, _, filenames in os.walk(dirname)
+               for filename in filenames)
+
+
+def main(args):
+    '''main method.'''
+    results_file = args[0] if args else 'benchmark.json'
+    sizes = [int(arg) for arg in args[1:]] or _SIZES
+
+    previous = {}
+
+    if os.path.exists(results_file):
+        with open(results_file) as in_file:
+            for result in json.load(in_file):
+                previous[(result['name'], result['constructs'])] = result
+
+    for num_constructs in sizes:
+        for name in ['lcr', 'phospho_lcr', 'order']:
+            result = run_case(name, num_constructs)
+            prev = previous.get((name, num_constructs))
+
+            print('%-12s %6d constructs: %8.2fs %8d KB %10d bytes%s' %
+                  (name, num_constructs, result['wall_time'],
+                   result['peak_memory_kb'], result['output_bytes'],
+                   ' (%.2fx previous time)' %
+                   (result['wall_time'] / prev['wall_time'])
+                   if prev and prev['wall_time'] else ''))
+
+            previous[(name, num_constructs)] = result
+
+    with open(results_file, 'w') as out_file:
+        json.dump([previous[key] for key in sorted(previous)], out_file,
+                  indent=2)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -8,11 +8,74 @@ To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
 @author:  neilswainston
 '''
 # pylint: disable=too-few-public-methods
+from multiprocessing.pool import ThreadPool
 import re
+import threading
+import time
+from xml.etree.ElementTree import ParseError
 
-from synbiochem.utils.ice_utils import ICEClient
+from synbiochem.utils.ice_utils import ICEClient, ICEEntry
 from synbiochem.utils.job import JobThread
 
+from lcr_utils import snapshot
+from lcr_utils.cache import EntryCache
+from lcr_utils.stats import JobStats
+
+
+class Part(object):
+    '''Compact record of the ICE entry fields used in building.'''
+    __slots__ = ['part_id', 'name', 'typ', 'subtype', 'desc', 'linked_parts']
+
+    def __init__(self, part_id, name, typ, subtype, desc, linked_parts):
+        self.part_id = part_id
+        self.name = name
+        self.typ = typ
+        self.subtype = subtype
+        self.desc = desc
+        self.linked_parts = linked_parts
+
+    def get_order(self):
+        '''Gets fields as an order list.'''
+        return [self.part_id, self.name, self.typ, self.subtype, self.desc]
+
+
+class AssemblyGraph(object):
+    '''Plasmids resolved to their backbone, ORF and domino parts.'''
+
+    def __init__(self):
+        self.__pools = {}
+        self.__parts = {}
+
+    def add(self, ice_id, parts):
+        '''Adds a plasmid and its linked parts, classified by Type.'''
+        pool = {'backbone': [], 'parts': [], 'dominoes': []}
+
+        for part in parts:
+            if part.subtype == 'ORF':
+                pool['parts'].append(part)
+            elif part.subtype == 'DOMINO':
+                pool['dominoes'].append(part)
+            else:
+                # Assume backbone:
+                pool['backbone'].append(part)
+
+            self.__parts[part.part_id] = part
+
+        self.__pools[ice_id] = pool
+
+    def get_pools(self):
+        '''Gets map of plasmid ice_id to backbone, parts and dominoes.'''
+        return self.__pools
+
+    def get_parts(self):
+        '''Gets de-duplicated map of partId to Part.'''
+        return self.__parts
+
+    def get_order(self):
+        '''Gets de-duplicated parts list for ordering, sorted by partId.'''
+        return [self.__parts[key].get_order()
+                for key in sorted(self.__parts)]
+
 
 class BuildGenieBase(JobThread):
     '''Base class for build applications.'''
@@ -21,46 +84,278 @@ class BuildGenieBase(JobThread):
         JobThread.__init__(self)
 
         self._query = query
-        self._ice_client = ICEClient(
-            query['ice']['url'],
-            query['ice']['username'],
-            query['ice']['password'],
-            group_names=query['ice'].get('groups', None))
+        self._stats = JobStats(self._fire_event)
+        self._ice_client = None
+        self.__ice_client_lock = threading.Lock()
 
-        self._ice_ids = query['ice_ids']
+        # Optional offline design snapshot, read in place of ICE:
+        self.__snapshot = snapshot.read(query['snapshot']) \
+            if 'snapshot' in query else None
+
+        self._ice_ids = query['ice_ids'] if 'ice_ids' in query \
+            else self.__snapshot['ice_ids']
+        self.__plasmid_ids = set(self._ice_ids)
         self._data = {}
+        self.__seqs = {}
+        self.__graph = None
+        self.__num_threads = query.get('num_threads', 8)
+
+        # Optional persistent cache, e.g. {'path': 'ice_cache.db'}:
+        cache = query.get('cache', None)
+        self.__cache = EntryCache(**cache) if cache is not None else None
+        self.__modified = {}
 
     def get_order(self):
-        '''Gets a plasmids constituent parts list for ordering.'''
-        entries = {}
+        '''Gets a plasmids constituent parts list, with sequences, for
+        ordering.'''
+        order = self._get_graph().get_order()
+
+        with self._stats.stage('fetch_seqs'):
+            seqs = self.__map(self._get_seq, [row[0] for row in order])
+
+        return [row + [seq] for row, seq in zip(order, seqs)]
+
+    def write_snapshot(self, filename, seqs=True):
+        '''Writes resolved design, with part sequences if seqs is True, to
+        a snapshot file for offline runs.'''
+        graph = self._get_graph()
+        parts = dict(graph.get_parts())
+        parts.update({ice_id: self._get_data(ice_id)
+                      for ice_id in self._ice_ids})
+        seq_map = None
+
+        if seqs:
+            part_ids = sorted(graph.get_parts())
+
+            with self._stats.stage('fetch_seqs'):
+                seq_map = dict(zip(part_ids,
+                                   self.__map(self._get_seq, part_ids)))
+
+        snapshot.write(filename, self._ice_ids, parts.values(), seq_map)
+
+    def iter_order(self, chunk_size=1000):
+        '''Yields de-duplicated parts, with sequences, for ordering as they
+        resolve. Plasmids are resolved in chunks, each chunk's data being
+        released before the next is fetched, so memory is bounded by chunk
+        size rather than design size.'''
+        ice_ids = self._ice_ids
+        seen = set()
 
-        for ice_id in self._ice_ids:
-            data = self._get_data(ice_id)
+        try:
+            for idx in range(0, len(ice_ids), chunk_size):
+                self._set_ice_ids(ice_ids[idx:idx + chunk_size])
 
-            for part in data[0].get_metadata()['linkedParts']:
-                data = self._get_data(part['partId'])
-                entries[data[1]] = list(data[2:])
+                order = [row for row in self._get_graph().get_order()
+                         if row[0] not in seen]
+                seen.update(row[0] for row in order)
+
+                for row, seq in zip(order,
+                                    self.__imap(self._get_seq,
+                                                [row[0] for row in order])):
+                    yield row + [seq]
+        finally:
+            self._set_ice_ids(ice_ids)
+
+    def _get_graph(self):
+        '''Gets AssemblyGraph, resolving it on first call.'''
+        if self.__graph is None:
+            with self._stats.stage('fetch'):
+                self._prefetch_data()
+
+            with self._stats.stage('resolve'):
+                graph = AssemblyGraph()
+
+                for ice_id in self._ice_ids:
+                    graph.add(ice_id,
+                              [self._get_data(part_id)
+                               for part_id
+                               in self._get_data(ice_id).linked_parts])
+
+            self.__graph = graph
+
+        return self.__graph
+
+    def _set_ice_ids(self, ice_ids):
+        '''Sets ice_ids, releasing all data resolved for previous ones.'''
+        self._ice_ids = ice_ids
+        self.__plasmid_ids = set(ice_ids)
+        self._data = {}
+        self.__seqs = {}
+        self.__graph = None
 
-        # Format into list of lists:
-        return [[key] + entries[key]
-                for key in sorted(entries)]
+    def _prefetch_data(self):
+        '''Fetches all plasmids, then all of their linked parts, in bulk.'''
+        if self.__snapshot is not None:
+            # Nothing to fetch:
+            return
+
+        self.__fetch_all(self._ice_ids)
+
+        self.__fetch_all([part_id
+                          for ice_id in self._ice_ids
+                          for part_id in self._get_data(ice_id).linked_parts])
+
+    def __fetch_all(self, ice_ids):
+        '''Fetches uncached ICE entries with a bounded worker pool.'''
+        self.__map(self._get_data, [ice_id
+                                    for ice_id in sorted(set(ice_ids))
+                                    if ice_id not in self._data])
+
+    def __map(self, func, ice_ids):
+        '''Maps func over ice_ids with a bounded worker pool.'''
+        if not ice_ids:
+            return []
+
+        # Workers share the single authenticated ICEClient session:
+        pool = ThreadPool(max(1, min(self.__num_threads, len(ice_ids))))
+
+        try:
+            return pool.map(func, ice_ids)
+        finally:
+            pool.close()
+            pool.join()
+            self.__flush_cache()
+
+    def __imap(self, func, ice_ids):
+        '''Lazily maps func over ice_ids with a bounded worker pool, yielding
+        results in order as they complete.'''
+        if not ice_ids:
+            return
+
+        pool = ThreadPool(max(1, min(self.__num_threads, len(ice_ids))))
+
+        try:
+            for result in pool.imap(func, ice_ids):
+                yield result
+        finally:
+            pool.terminate()
+            pool.join()
+            self.__flush_cache()
+
+    def __flush_cache(self):
+        '''Writes access times of cache hits once per batch of fetches.'''
+        if self.__cache:
+            self.__cache.flush()
 
     def _get_data(self, ice_id):
-        '''Gets data from ICE entry.'''
+        '''Gets Part from ICE entry metadata (sequence is not fetched).'''
         if ice_id in self._data:
             return self._data[ice_id]
 
-        ice_entry = self._ice_client.get_ice_entry(ice_id)
+        if self.__snapshot is not None:
+            name, typ, subtype, desc, linked_parts = \
+                self.__snapshot['parts'][ice_id]
+            data = Part(ice_id, name, typ, subtype, desc, tuple(linked_parts))
+            self._data[ice_id] = data
+            return data
+
+        ice_entry = self.__get_ice_entry(ice_id)
         metadata = ice_entry.get_metadata()
-        data = ice_entry, \
-            metadata['partId'], \
-            metadata['name'], \
-            metadata['type'], \
-            ice_entry.get_parameter('Type'), \
-            re.sub('\\s*\\[[^\\]]*\\]\\s*', ' ',
-                   metadata['shortDescription']).replace(' - ', '_'), \
-            ice_entry.get_seq()
+        linked_parts = metadata.get('linkedParts', [])
+
+        if not metadata.get('hasSequence', False):
+            # No sequence need be requested:
+            self.__seqs[ice_id] = ''
+
+        # Linked parts carry modification times, used to validate cache:
+        self.__modified.update({part['partId']: part['modificationTime']
+                                for part in linked_parts
+                                if 'modificationTime' in part})
+
+        # Only extracted fields are kept; the ICEEntry is released:
+        data = Part(metadata['partId'],
+                    metadata['name'],
+                    metadata['type'],
+                    ice_entry.get_parameter('Type'),
+                    re.sub('\\s*\\[[^\\]]*\\]\\s*', ' ',
+                           metadata['shortDescription']).replace(' - ', '_'),
+                    tuple(part['partId'] for part in linked_parts))
 
         self._data[ice_id] = data
 
         return data
+
+    def _get_seq(self, ice_id):
+        '''Gets sequence of ICE entry, fetching it on demand.'''
+        if self.__snapshot is not None:
+            if ice_id not in self.__snapshot['seqs']:
+                raise KeyError('No sequence of %s in snapshot' % ice_id)
+
+            return self.__snapshot['seqs'][ice_id]
+
+        if ice_id not in self.__seqs:
+            self.__seqs[ice_id] = \
+                self.__get_ice_entry(ice_id, seq=True).get_seq()
+
+        return self.__seqs[ice_id]
+
+    def _get_ice_client(self):
+        '''Gets ICEClient, connecting only when first required.'''
+        with self.__ice_client_lock:
+            if self._ice_client is None:
+                self._ice_client = ICEClient(
+                    self._query['ice']['url'],
+                    self._query['ice']['username'],
+                    self._query['ice']['password'],
+                    group_names=self._query['ice'].get('groups', None))
+
+        return self._ice_client
+
+    def __get_ice_entry(self, ice_id, seq=False):
+        '''Gets ICEEntry, from persistent cache if available. Sequence is
+        only requested from ICE if seq is True. Plasmids are always fetched,
+        as there is no modification time to validate their cached entries
+        against, and edits to their linked parts must be seen.'''
+        cached = None
+
+        if self.__cache and ice_id not in self.__plasmid_ids:
+            cached = self.__cache.get(ice_id, self.__modified.get(ice_id))
+
+            hit = cached and (not seq or _has_seq(cached))
+            self._stats.add_cache(hit)
+
+            if hit:
+                return cached
+
+        ice_client = self._get_ice_client()
+        start = time.time()
+
+        if seq and ice_id in self._data:
+            # Metadata is already resolved, so only the sequence is
+            # requested:
+            ice_entry = cached or ICEEntry(typ=self._data[ice_id].typ)
+            ice_entry.set_dna(_get_dna(ice_client, ice_id))
+        elif seq:
+            ice_entry = ice_client.get_ice_entry(ice_id)
+        else:
+            # ICEClient offers no public metadata-only request:
+            # pylint: disable=protected-access
+            ice_entry = ICEEntry(
+                metadata=ice_client._ICEClient__get_meta_data(ice_id))
+
+        self._stats.add_request(time.time() - start)
+
+        # Entries are cached only with their metadata:
+        if self.__cache and ice_id not in self.__plasmid_ids and \
+                'partId' in ice_entry.get_metadata():
+            self.__cache.put(ice_id, ice_entry,
+                             ice_entry.get_metadata().get('modificationTime'))
+
+        return ice_entry
+
+
+def _get_dna(ice_client, ice_id):
+    '''Gets DNA of ICE entry, requesting its sequence only.'''
+    try:
+        # ICEClient offers no public sequence-only request:
+        # pylint: disable=protected-access
+        return ice_client._ICEClient__get_dna(ice_id)
+    except ParseError:
+        # As ICEClient.get_ice_entry, unparseable sequences are ignored:
+        return None
+
+
+def _has_seq(ice_entry):
+    '''Checks whether ICEEntry holds its sequence, if it has one.'''
+    return ice_entry.get_dna() is not None or \
+        not ice_entry.get_metadata().get('hasSequence', False)
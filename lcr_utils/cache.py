@@ -0,0 +1,151 @@
+'''
+lcr (c) University of Manchester 2018
+
+lcr is licensed under the MIT License.
+
+To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
+
+@author:  neilswainston
+'''
+import cPickle as pickle
+import os
+import sqlite3
+import threading
+import time
+
+
+_DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.lcr_utils',
+                             'ice_cache.db')
+
+
+# Fraction of max_entries evicted at once, and number of cache hits whose
+# access times are written in one transaction:
+_EVICT_FRACTION = 0.1
+_ACCESS_BATCH = 1000
+
+
+class EntryCache(object):
+    '''Persistent, size-bounded cache of ICE entries, keyed by partId.'''
+
+    def __init__(self, path=_DEFAULT_PATH, ttl=24 * 60 * 60,
+                 max_entries=100000):
+        self.__ttl = ttl
+        self.__max_entries = max_entries
+        self.__lock = threading.Lock()
+        self.__accessed = {}
+
+        dirname = os.path.dirname(os.path.abspath(path))
+
+        try:
+            os.makedirs(dirname)
+        except OSError:
+            # May already exist, or be created concurrently by another job:
+            if not os.path.isdir(dirname):
+                raise
+
+        self.__conn = sqlite3.connect(path, timeout=60,
+                                      check_same_thread=False)
+
+        # Write-ahead logging lets concurrent job processes share the cache:
+        self.__conn.execute('PRAGMA journal_mode=WAL')
+        self.__conn.execute('PRAGMA synchronous=NORMAL')
+
+        with self.__lock, self.__conn:
+            self.__conn.execute('CREATE TABLE IF NOT EXISTS entry ('
+                                'part_id TEXT PRIMARY KEY, '
+                                'modified TEXT, '
+                                'fetched REAL, '
+                                'accessed REAL, '
+                                'data BLOB)')
+            self.__conn.execute('CREATE INDEX IF NOT EXISTS entry_accessed '
+                                'ON entry(accessed)')
+
+            # Upper bound, as other processes may also insert or evict:
+            self.__num_entries = self.__count()
+
+    def get(self, part_id, modified=None):
+        '''Gets cached entry, or None if missing, expired or out of date.'''
+        with self.__lock:
+            row = self.__conn.execute('SELECT modified, fetched, data '
+                                      'FROM entry WHERE part_id=?',
+                                      (part_id,)).fetchone()
+
+            if row is None:
+                return None
+
+            now = time.time()
+
+            if now - row[1] > self.__ttl or \
+                    (modified is not None and str(modified) != row[0]):
+                return None
+
+            # Access times, used for eviction, are written in batches:
+            self.__accessed[part_id] = now
+
+            if len(self.__accessed) >= _ACCESS_BATCH:
+                self.__flush()
+
+            return pickle.loads(str(row[2]))
+
+    def put(self, part_id, entry, modified=None):
+        '''Stores entry, evicting least recently used entries if full.'''
+        now = time.time()
+        data = sqlite3.Binary(pickle.dumps(entry, pickle.HIGHEST_PROTOCOL))
+
+        with self.__lock:
+            with self.__conn:
+                self.__conn.execute('INSERT OR REPLACE INTO entry '
+                                    'VALUES (?, ?, ?, ?, ?)',
+                                    (part_id,
+                                     None if modified is None
+                                     else str(modified),
+                                     now, now, data))
+
+            self.__num_entries += 1
+
+            if self.__num_entries > self.__max_entries:
+                self.__evict()
+
+    def flush(self):
+        '''Writes pending access times of cache hits.'''
+        with self.__lock:
+            self.__flush()
+
+    def close(self):
+        '''Writes pending access times and closes the underlying
+        database.'''
+        with self.__lock:
+            self.__flush()
+            self.__conn.close()
+
+    def __flush(self):
+        '''Writes pending access times of cache hits in one transaction.'''
+        if self.__accessed:
+            with self.__conn:
+                self.__conn.executemany('UPDATE entry SET accessed=? '
+                                        'WHERE part_id=?',
+                                        [(accessed, part_id)
+                                         for part_id, accessed
+                                         in self.__accessed.iteritems()])
+
+            self.__accessed = {}
+
+    def __evict(self):
+        '''Evicts least recently used entries in a batch, leaving room for
+        further puts before the next eviction.'''
+        self.__flush()
+        self.__num_entries = self.__count()
+        excess = self.__num_entries - \
+            int(self.__max_entries * (1 - _EVICT_FRACTION))
+
+        if self.__num_entries > self.__max_entries and excess > 0:
+            with self.__conn:
+                self.__conn.execute('DELETE FROM entry WHERE part_id IN '
+                                    '(SELECT part_id FROM entry '
+                                    'ORDER BY accessed LIMIT ?)', (excess,))
+
+            self.__num_entries -= excess
+
+    def __count(self):
+        '''Counts entries.'''
+        return self.__conn.execute('SELECT COUNT(*) FROM entry').fetchone()[0]
@@ -0,0 +1,149 @@
+'''
+lcr (c) University of Manchester 2018
+
+lcr is licensed under the MIT License.
+
+To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
+
+@author:  neilswainston
+'''
+from importlib import import_module
+import json
+import os
+import sys
+
+
+# Protocols by name, as (module, attribute), imported only when run:
+PROTOCOLS = {'lcr': ('lcr_utils.lcr', 'LCR'),
+             'phospho_lcr': ('lcr_utils.phospho_lcr', 'PHOSPHO_LCR')}
+
+# Resolved design, shared by all protocols, is written to outdir:
+_SNAPSHOT = 'design.json.gz'
+
+# Manifest keys that are not query parameters:
+_CLI_PARAMS = ['protocols', 'outdir', 'order']
+
+_USAGE = '''usage: python -m lcr_utils.cli MANIFEST [OUTDIR]
+
+MANIFEST is a JSON file, or - to read it from stdin, e.g.:
+
+  {"ice": {"url": ..., "username": ..., "password": ...},
+   "ice_ids": "ice_ids.txt",
+   "protocols": ["lcr", "phospho_lcr"],
+   "order": "parts.fasta",
+   "ordering": "robot"}
+
+ice_ids is a list, or a file of one ice_id per line (- for stdin). A
+"snapshot" may be given in place of ice and ice_ids, to run offline. Other
+keys are passed to each protocol as query parameters.
+
+Protocols: %s'''
+
+
+def read_manifest(in_file):
+    '''Reads manifest, loading ice_ids from file if given as a filename.'''
+    manifest = json.load(in_file)
+    ice_ids = manifest.get('ice_ids')
+
+    if isinstance(ice_ids, basestring):
+        if ice_ids == '-':
+            if in_file is sys.stdin:
+                raise ValueError('Manifest and ice_ids cannot both be read '
+                                 'from stdin')
+
+            manifest['ice_ids'] = _read_ice_ids(sys.stdin)
+        else:
+            with open(ice_ids) as ice_ids_file:
+                manifest['ice_ids'] = _read_ice_ids(ice_ids_file)
+
+    protocols = manifest.get('protocols', ['lcr'])
+
+    if isinstance(protocols, basestring):
+        protocols = [protocols]
+
+    unknown = [name for name in protocols if name not in PROTOCOLS]
+
+    if unknown:
+        raise ValueError('Unknown protocols %s: expected one of %s' %
+                         (unknown, sorted(PROTOCOLS)))
+
+    manifest['protocols'] = protocols
+
+    if 'snapshot' not in manifest and \
+            ('ice' not in manifest or 'ice_ids' not in manifest):
+        raise ValueError('Manifest requires ice and ice_ids, or snapshot')
+
+    if 'ice_ids' in manifest and not manifest['ice_ids']:
+        raise ValueError('No ice_ids given')
+
+    return manifest
+
+
+def run(manifest, outdir='assembly'):
+    '''Resolves design once, then runs each protocol over it, writing to its
+    own directory under outdir. Returns map of protocol to output
+    directory.'''
+    # Deferred, so that usage and manifest errors are reported without
+    # loading synbiochem:
+    from lcr_utils.assembly import AssemblyThread
+    from lcr_utils.build import BuildGenieBase
+
+    query = {key: value for key, value in manifest.iteritems()
+             if key not in _CLI_PARAMS}
+
+    if not os.path.exists(outdir):
+        os.makedirs(outdir)
+
+    if 'snapshot' not in query:
+        # One ICE session resolves the design for every protocol. Sequences
+        # are fetched only if an output requires them:
+        filename = os.path.join(outdir, _SNAPSHOT)
+        BuildGenieBase(query).write_snapshot(
+            filename,
+            seqs=bool('order' in manifest or query.get('seqs') or
+                      'validate' in query))
+
+        query = {key: value for key, value in query.iteritems()
+                 if key not in ['ice', 'ice_ids', 'cache']}
+        query['snapshot'] = filename
+
+    outdirs = {}
+
+    if 'order' in manifest:
+        from lcr_utils.order import export
+        export(BuildGenieBase(query), manifest['order'])
+
+    for name in manifest['protocols']:
+        module, attr = PROTOCOLS[name]
+        outdirs[name] = os.path.join(outdir, name)
+        AssemblyThread(dict(query), outdirs[name],
+                       getattr(import_module(module), attr)).run()
+
+    return outdirs
+
+
+def _read_ice_ids(in_file):
+    '''Reads ice_ids, one per line, ignoring blank lines.'''
+    return [line.strip() for line in in_file if line.strip()]
+
+
+def main(args):
+    '''main method.'''
+    if not args or args[0] in ['-h', '--help']:
+        print(_USAGE % ', '.join(sorted(PROTOCOLS)))
+        return
+
+    if args[0] == '-':
+        manifest = read_manifest(sys.stdin)
+    else:
+        with open(args[0]) as in_file:
+            manifest = read_manifest(in_file)
+
+    outdir = args[1] if len(args) > 1 else manifest.get('outdir', 'assembly')
+
+    for name, protocol_outdir in sorted(run(manifest, outdir).iteritems()):
+        print('%s\t%s' % (name, protocol_outdir))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,210 @@
+'''
+lcr (c) University of Manchester 2018
+
+lcr is licensed under the MIT License.
+
+To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
+
+@author:  neilswainston
+'''
+import math
+import string
+
+from Bio.SeqUtils.MeltingTemp import DNA_NN3
+import numpy as np
+from synbiochem.utils.seq_utils import DNTP, K, MG, NA, TRIS
+
+
+COLS = ['plasmid_id', 'domino_id', 'left_id', 'right_id', 'left_tm',
+        'right_tm', 'flags']
+
+# Reagent concentrations (M) and oligo concentration (nM), as
+# synbiochem.utils.seq_utils.get_melting_temp:
+_REAG_CONCS = {NA: 0.05, K: 0, TRIS: 0, MG: 0.01, DNTP: 0}
+_DNAC = 30
+
+_R = 1.987
+
+_NUCLS = 'ACGT'
+
+_COMP = string.maketrans(_NUCLS, 'TGCA')
+
+# Nucleotide codes, with 4 for any other character:
+_CODES = np.full(256, 4, dtype=np.int64)
+_CODES[[ord(nucl) for nucl in _NUCLS]] = range(len(_NUCLS))
+
+
+def _get_nn_table(idx):
+    '''Gets nearest-neighbour enthalpy (idx 0) or entropy (idx 1) table,
+    indexed by 5 * first code + second code. Pairs including any other
+    character are zero.'''
+    table = np.zeros(25)
+
+    for first, nucl1 in enumerate(_NUCLS):
+        for second, nucl2 in enumerate(_NUCLS):
+            pair = nucl1 + nucl2
+            neighbors = pair + '/' + pair.translate(_COMP)
+            table[5 * first + second] = \
+                DNA_NN3[neighbors if neighbors in DNA_NN3
+                        else neighbors[::-1]][idx]
+
+    return table
+
+
+_NN_H = _get_nn_table(0)
+_NN_S = _get_nn_table(1)
+
+
+def get_melting_temps(seqs, reag_concs=None):
+    '''Calculates nearest-neighbour melting temperatures of sequences
+    against their complements, vectorised over all sequences. Results
+    match synbiochem.utils.seq_utils.get_melting_temp.'''
+    if not seqs:
+        return np.zeros(0)
+
+    concs = dict(_REAG_CONCS)
+    concs.update(reag_concs or {})
+
+    # Sequences, e.g. from snapshot JSON, may be unicode:
+    seqs = [str(seq) for seq in seqs]
+
+    lens = np.array([len(seq) for seq in seqs])
+    width = lens.max()
+    codes = _CODES[np.frombuffer(''.join(seq.ljust(width, 'N')
+                                         for seq in seqs),
+                                 dtype=np.uint8).reshape(len(seqs), width)]
+
+    # Sum of stacked pairs, pairs including padding contributing nothing:
+    pairs = codes[:, :-1] * 5 + codes[:, 1:]
+
+    first = codes[:, 0]
+    last = codes[np.arange(len(seqs)), lens - 1]
+    num_gc = ((codes == 1) | (codes == 2)).sum(axis=1)
+    ends_at = (first % 3 == 0).astype(int) + (last % 3 == 0)
+    ends_gc = 2 - ends_at
+
+    delta_h = _NN_H[pairs].sum(axis=1) + \
+        _get_init(0, num_gc, first, last, ends_at, ends_gc)
+    delta_s = _NN_S[pairs].sum(axis=1) + \
+        _get_init(1, num_gc, first, last, ends_at, ends_gc)
+
+    melting_temps = 1000 * delta_h / \
+        (delta_s + _R * math.log(_DNAC * 1e-9)) - 273.15
+
+    corr = _get_salt_correction(concs, num_gc / lens.astype(float), lens)
+
+    return 1 / (1 / (melting_temps + 273.15) + corr) - 273.15
+
+
+def validate(ice_ids, pools, seqs, min_tm=65.0, max_tm=75.0,
+             reag_concs=None):
+    '''Validates each plasmid's dominoes, checking that each bridges the
+    end of one of its parts and the start of another, in either
+    orientation, and that the melting temperatures of both halves lie in
+    range. Returns rows of COLS, flags being empty if valid.'''
+    # Sequences, e.g. from snapshot JSON, may be unicode:
+    seqs = {part_id: str(seq).upper() for part_id, seq in seqs.iteritems()
+            if seq}
+    junctions = []
+
+    for ice_id in ice_ids:
+        parts = pools[ice_id]['backbone'] + pools[ice_id]['parts']
+
+        for domino in pools[ice_id]['dominoes']:
+            seq = seqs.get(domino.part_id)
+            junction = _get_junction(seq, parts, seqs) if seq else None
+            junctions.append((ice_id, domino.part_id, seq, junction))
+
+    halves = sorted(set(half
+                        for _, _, _, junction in junctions if junction
+                        for half in junction[2:]))
+
+    melting_temps = dict(zip(halves, get_melting_temps(halves, reag_concs)))
+    report = []
+
+    for ice_id, domino_id, seq, junction in junctions:
+        if not seq:
+            report.append([ice_id, domino_id, None, None, None, None,
+                           'no_sequence'])
+        elif not junction:
+            report.append([ice_id, domino_id, None, None, None, None,
+                           'no_junction'])
+        else:
+            temps = [melting_temps[half] for half in junction[2:]]
+            flags = ['%s_%s_tm' % (side, 'low' if temp < min_tm else 'high')
+                     for side, temp in zip(['left', 'right'], temps)
+                     if temp < min_tm or temp > max_tm]
+
+            report.append([ice_id, domino_id] + list(junction[:2]) + temps +
+                          ['|'.join(flags)])
+
+    return report
+
+
+def _get_junction(seq, parts, seqs):
+    '''Gets (left part_id, right part_id, left half, right half) of the
+    junction bridged by domino seq, or None.'''
+    overlap = len(seq) - 1
+
+    for strand in [seq, seq.translate(_COMP)[::-1]]:
+        for left in parts:
+            tail = seqs.get(left.part_id, '')[-overlap:]
+
+            for right in parts:
+                # Domino must span the junction, so cannot lie in tail or
+                # head alone:
+                pos = (tail + seqs.get(right.part_id, '')[:overlap]) \
+                    .find(strand)
+
+                if pos != -1:
+                    split = len(tail) - pos
+                    return left.part_id, right.part_id, strand[:split], \
+                        strand[split:]
+
+    return None
+
+
+def _get_init(idx, num_gc, first, last, ends_at, ends_gc):
+    '''Gets initiation enthalpy (idx 0) or entropy (idx 1) terms.'''
+    return DNA_NN3['init'][idx] + \
+        np.where(num_gc == 0, DNA_NN3['init_allA/T'][idx],
+                 DNA_NN3['init_oneG/C'][idx]) + \
+        DNA_NN3['init_5T/A'][idx] * ((first == 3).astype(int) +
+                                     (last == 0)) + \
+        DNA_NN3['init_A/T'][idx] * ends_at + \
+        DNA_NN3['init_G/C'][idx] * ends_gc + \
+        DNA_NN3['sym'][idx]
+
+
+def _get_salt_correction(concs, gc_frac, lens):
+    '''Gets Owczarzy et al. (2008) salt correction of reciprocal melting
+    temperatures.'''
+    mon = concs[NA] + concs[K] + concs[TRIS] / 2.0
+    mg = concs[MG]
+    a, b, c, d = 3.92, -0.911, 6.26, 1.42
+    e, f, g = -48.2, 52.5, 8.31
+
+    if concs[DNTP] > 0:
+        # Mg bound by dNTPs is unavailable:
+        dntps = concs[DNTP]
+        ka = 3e4
+        mg = (-(ka * dntps - ka * mg + 1.0) +
+              math.sqrt((ka * dntps - ka * mg + 1.0) ** 2 +
+                        4.0 * ka * mg)) / (2.0 * ka)
+
+    if mon > 0:
+        ratio = math.sqrt(mg) / mon
+
+        if ratio < 0.22:
+            return (4.29 * gc_frac - 3.95) * 1e-5 * math.log(mon) + \
+                9.40e-6 * math.log(mon) ** 2
+        elif ratio < 6.0:
+            a = 3.92 * (0.843 - 0.352 * math.sqrt(mon) * math.log(mon))
+            d = 1.42 * (1.279 - 4.03e-3 * math.log(mon) -
+                        8.03e-3 * math.log(mon) ** 2)
+            g = 8.31 * (0.486 - 0.258 * math.log(mon) +
+                        5.25e-3 * math.log(mon) ** 3)
+
+    return (a + b * math.log(mg) + gc_frac * (c + d * math.log(mg)) +
+            (1 / (2.0 * (lens - 1))) *
+            (e + f * math.log(mg) + g * math.log(mg) ** 2)) * 1e-5
@@ -0,0 +1,72 @@
+'''
+lcr (c) University of Manchester 2018
+
+lcr is licensed under the MIT License.
+
+To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
+
+@author:  neilswainston
+'''
+import string
+
+import numpy as np
+
+
+# Rows and columns of standard plate formats:
+PLATE_FORMATS = {96: (8, 12), 384: (16, 24), 1536: (32, 48)}
+
+
+class PlateLayout(object):
+    '''Maps fill-order well indices to plate wells. Wells fill column by
+    column. Where a multichannel head spans a column at a pitch of several
+    rows, as 8 channels do on 384 and 1536-well plates, each column fills
+    in head-aligned blocks: one well per channel, rows a pitch apart, so
+    that consecutive indices are dispensed in one motion.'''
+
+    def __init__(self, rows=8, cols=12, channels=8):
+        self.rows = rows
+        self.cols = cols
+        self.pitch = get_pitch(rows, channels)
+
+        # Channels reaching a column in one pass of the head:
+        self.channels = min(channels, rows // self.pitch)
+
+        in_col = np.arange(rows)
+        rows_order = (in_col % (rows // self.pitch)) * self.pitch + \
+            in_col // (rows // self.pitch)
+
+        # Physical (column-major) index of each fill-order index:
+        self.__positions = (np.arange(cols)[:, None] * rows +
+                            rows_order[None, :]).ravel()
+
+    def get_positions(self):
+        '''Gets physical column-major well index of each fill-order
+        index.'''
+        return self.__positions
+
+    def get_channel(self, idx):
+        '''Gets channel dispensing to fill-order index idx, indices beyond
+        the plate continuing onto further plates.'''
+        return self.__positions[idx % len(self.__positions)] % self.rows // \
+            self.pitch % self.channels
+
+    def get_well_names(self):
+        '''Gets lookup table of well names by fill-order index.'''
+        return np.array([_get_row_name(pos % self.rows) +
+                         str(pos // self.rows + 1)
+                         for pos in self.__positions], dtype=object)
+
+
+def get_pitch(rows, channels):
+    '''Gets rows between adjacent channels of a head spanning a column, e.g.
+    2 for 8 channels on 16-row (384-well) plates.'''
+    return rows // channels \
+        if channels > 1 and rows > channels and rows % channels == 0 else 1
+
+
+def _get_row_name(row):
+    '''Gets row name: A-Z, then AA, AB, etc. as on 1536-well plates.'''
+    letters = string.ascii_uppercase
+
+    return letters[row] if row < len(letters) \
+        else letters[row // len(letters) - 1] + letters[row % len(letters)]
@@ -8,24 +8,106 @@ To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
 @author:  neilswainston
 '''
 import csv
+import os
 import sys
+import tempfile
+
+from Bio import SeqIO
+from Bio.Alphabet import generic_dna
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
 
 from lcr_utils.build import BuildGenieBase
 
 
+# Output formats, by filename extension:
+_FORMATS = {'.csv': 'csv',
+            '.fasta': 'fasta',
+            '.fa': 'fasta',
+            '.gb': 'genbank',
+            '.gbk': 'genbank'}
+
+# Design snapshots, for offline runs, are written as gzipped JSON:
+_SNAPSHOT_EXT = '.json.gz'
+
+_COLS = ['id', 'name', 'type', 'subtype', 'description', 'sequence']
+
+
+def export(genie, filename='out.csv', chunk_size=1000):
+    '''Streams de-duplicated parts, with sequences, to a csv, FASTA or
+    GenBank file, the format being chosen by filename extension.'''
+    fmt = _get_format(filename)
+    dirname = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_filename = tempfile.mkstemp(
+        prefix='.' + os.path.basename(filename), suffix='.tmp', dir=dirname)
+
+    try:
+        with os.fdopen(fd, 'w', 1024 * 1024) as out_file:
+            if fmt == 'csv':
+                writer = csv.writer(out_file)
+                writer.writerow(_COLS)
+
+            for entry in genie.iter_order(chunk_size):
+                if fmt == 'csv':
+                    writer.writerow([str(val) if val else ''
+                                     for val in entry])
+                elif entry[5]:
+                    # Parts without sequence cannot be synthesised:
+                    SeqIO.write(_get_record(entry), out_file, fmt)
+
+        # Publish complete file only:
+        os.rename(tmp_filename, filename)
+    except BaseException:
+        os.remove(tmp_filename)
+        raise
+
+
+def _get_format(filename):
+    '''Gets output format from filename extension.'''
+    ext = os.path.splitext(filename)[1].lower()
+
+    if ext not in _FORMATS:
+        raise ValueError('Unsupported output format: ' + filename)
+
+    return _FORMATS[ext]
+
+
+def _get_record(entry):
+    '''Gets SeqRecord of order entry.'''
+    # GenBank LOCUS names are limited to 16 characters:
+    return SeqRecord(Seq(entry[5], generic_dna),
+                     id=entry[0],
+                     name=entry[0][:16],
+                     description=' '.join(str(val)
+                                          for val in entry[1:5] if val))
+
+
 def main(args):
     '''main method.'''
-    genie = BuildGenieBase({'ice': {'url': args[0],
-                                    'username': args[1],
-                                    'password': args[2]},
-                            'ice_ids': args[3:]})
+    # A design snapshot, optionally followed by output path, is run offline:
+    if len(args) <= 2:
+        genie = BuildGenieBase({'snapshot': args[0]})
+        filename = args[1] if len(args) > 1 else 'out.csv'
+    else:
+        # Optional output path follows credentials, e.g. parts.fasta or
+        # design.json.gz:
+        ice_ids = args[3:]
+        filename = 'out.csv'
+
+        if ice_ids and (ice_ids[0].endswith(_SNAPSHOT_EXT) or
+                        os.path.splitext(ice_ids[0])[1].lower() in _FORMATS):
+            filename = ice_ids.pop(0)
 
-    writer = csv.writer(open('out.csv', 'w'))
-    writer.writerow(['id', 'name', 'type', 'subtype', 'description',
-                     'sequence'])
+        genie = BuildGenieBase({'ice': {'url': args[0],
+                                        'username': args[1],
+                                        'password': args[2]},
+                                'ice_ids': ice_ids,
+                                'cache': {}})
 
-    for entry in genie.get_order():
-        writer.writerow([str(val) if val else '' for val in entry])
+    if filename.endswith(_SNAPSHOT_EXT):
+        genie.write_snapshot(filename)
+    else:
+        export(genie, filename)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,143 @@
+'''
+lcr (c) University of Manchester 2018
+
+lcr is licensed under the MIT License.
+
+To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
+
+@author:  neilswainston
+'''
+from _collections import defaultdict
+import csv
+import filecmp
+import os
+import tempfile
+
+import numpy as np
+
+
+_BUFFER_SIZE = 1024 * 1024
+
+_TABLE_FORMATS = ['parquet', 'arrow']
+
+
+class OutputWriter(object):
+    '''Keeps one buffered handle per output CSV, publishing each file
+    atomically (temp file and rename) on close, files identical to those
+    already published being left untouched. Tables may optionally be
+    published in parquet or arrow format.'''
+
+    def __init__(self, outdir, table_format=None):
+        if table_format is not None and table_format not in _TABLE_FORMATS:
+            raise ValueError('Unsupported table format: ' + table_format)
+
+        if table_format is not None:
+            # Fail before any output is written if pyarrow is unavailable:
+            _import_pyarrow()
+
+        self.__outdir = outdir
+        self.__table_format = table_format
+        self.__files = {}
+        self.__tables = defaultdict(list)
+
+    def writerow(self, name, row):
+        '''Appends a row to the named output.'''
+        self.__get_writer(name).writerow(row)
+
+    def writerows(self, name, rows):
+        '''Appends rows to the named output.'''
+        self.__get_writer(name).writerows(rows)
+
+    def add_table(self, name, columns):
+        '''Appends columns, as (name, values) pairs, to the named table.'''
+        self.__tables[name].append(columns)
+
+    def close(self):
+        '''Flushes and publishes all outputs, returning their filenames.'''
+        published = []
+
+        for name, (out_file, filename, _) in sorted(self.__files.iteritems()):
+            out_file.flush()
+            os.fsync(out_file.fileno())
+            out_file.close()
+            _publish(filename, os.path.join(self.__outdir, name + '.csv'))
+            published.append(name + '.csv')
+
+        for name, tables in sorted(self.__tables.iteritems()):
+            filename = name + '.' + self.__table_format
+            fd, tmp_filename = tempfile.mkstemp(suffix='.tmp',
+                                                prefix='.' + name,
+                                                dir=self.__outdir)
+            os.close(fd)
+
+            try:
+                _write_table(tables, tmp_filename, self.__table_format)
+            except BaseException:
+                os.remove(tmp_filename)
+                raise
+
+            _publish(tmp_filename, os.path.join(self.__outdir, filename))
+            published.append(filename)
+
+        self.__files = {}
+        self.__tables = defaultdict(list)
+
+        return published
+
+    def abort(self):
+        '''Discards all unpublished outputs.'''
+        for out_file, filename, _ in self.__files.itervalues():
+            out_file.close()
+            os.remove(filename)
+
+        self.__files = {}
+        self.__tables = defaultdict(list)
+
+    def __get_writer(self, name):
+        '''Gets csv writer for the named output, opening it if required.'''
+        if name not in self.__files:
+            fd, filename = tempfile.mkstemp(suffix='.tmp', prefix='.' + name,
+                                            dir=self.__outdir)
+            out_file = os.fdopen(fd, 'wb', _BUFFER_SIZE)
+            self.__files[name] = out_file, filename, csv.writer(out_file)
+
+        return self.__files[name][2]
+
+
+def _publish(tmp_filename, filename):
+    '''Publishes temp file as filename, unless its contents are unchanged.'''
+    if os.path.exists(filename) and \
+            filecmp.cmp(tmp_filename, filename, shallow=False):
+        os.remove(tmp_filename)
+    else:
+        os.rename(tmp_filename, filename)
+
+
+def _write_table(tables, filename, table_format):
+    '''Writes concatenated tables in parquet or arrow format.'''
+    pyarrow = _import_pyarrow()
+
+    table = pyarrow.Table.from_arrays(
+        [pyarrow.array(np.concatenate([columns[idx][1]
+                                       for columns in tables]))
+         for idx in range(len(tables[0]))],
+        [col_name for col_name, _ in tables[0]])
+
+    if table_format == 'parquet':
+        from pyarrow import parquet
+        parquet.write_table(table, filename)
+    else:
+        with pyarrow.OSFile(filename, 'wb') as sink:
+            writer = pyarrow.RecordBatchFileWriter(sink, table.schema)
+            writer.write_table(table)
+            writer.close()
+
+
+def _import_pyarrow():
+    '''Imports pyarrow, an optional dependency only required for tables.'''
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError('pyarrow is required for parquet or arrow output')
+
+    return pyarrow
@@ -0,0 +1,71 @@
+'''
+lcr (c) University of Manchester 2018
+
+lcr is licensed under the MIT License.
+
+To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
+
+@author:  neilswainston
+'''
+import numpy as np
+
+
+# A protocol is declared as a dict of:
+#
+# plates: [[plate_id, [reagent, ...]], ...], reagents placed in source wells.
+# parts_plate: plate_id of the plate to which all parts are prepended.
+# steps: [step, ...], each step a dict of:
+#     id: destination plate id.
+#     total: reaction volume, made up with water after deducting part_vol
+#         per part (optional).
+#     part_vol: water deducted per part.
+#     parts: [[pool key, vol], ...], e.g. [['backbone', 1], ['parts', 1]],
+#         pool keys being those of AssemblyGraph.get_pools().
+#     pools: [[pool id, vol], ...], pools made by earlier steps.
+#     reagents: [[reagent, vol], ...].
+#     pool: pool id under which this step's destinations are registered,
+#         e.g. domino_pool.
+
+
+def get_transfers(step, pools, ice_ids):
+    '''Computes a step's transfers as a sparse construct x component volume
+    matrix. Returns a list of blocks, in worklist order, each of
+    (kind, construct indices, components, volumes).'''
+    num = len(ice_ids)
+    parts = step.get('parts', [])
+    constructs = np.arange(num)
+    blocks = []
+
+    # counts[i, j]: number of parts of class j in construct i:
+    counts = np.array([[len(pools[ice_id][key]) for key, _ in parts]
+                       for ice_id in ice_ids],
+                      dtype=int).reshape(num, len(parts))
+
+    if 'total' in step:
+        blocks.append(('water', constructs, [None] * num,
+                       step['total'] -
+                       counts.sum(axis=1) * step.get('part_vol', 0)))
+
+    if parts:
+        blocks.append(('parts',
+                       np.repeat(constructs, counts.sum(axis=1)),
+                       [part
+                        for ice_id in ice_ids
+                        for key, _ in parts
+                        for part in pools[ice_id][key]],
+                       np.repeat(np.tile([vol for _, vol in parts], num),
+                                 counts.ravel())))
+
+    for pool_id, vol in step.get('pools', []):
+        blocks.append(('pools', constructs, [pool_id] * num,
+                       np.full(num, vol, dtype=float)))
+
+    reagents = step.get('reagents', [])
+
+    if reagents:
+        blocks.append(('reagents',
+                       np.repeat(constructs, len(reagents)),
+                       [reagent for reagent, _ in reagents] * num,
+                       np.tile([vol for _, vol in reagents], num)))
+
+    return blocks
@@ -0,0 +1,130 @@
+'''
+lcr (c) University of Manchester 2018
+
+lcr is licensed under the MIT License.
+
+To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
+
+@author:  neilswainston
+'''
+from lcr_utils.layout import get_pitch
+
+
+# Indicative timings (s) and capacities of a multichannel liquid handler:
+_TIP_CHANGE = 6.0
+_ASPIRATE = 3.0
+_DISPENSE = 2.0
+_PLATE_MOVE = 4.0
+_WELL_MOVE = 0.1
+_TIP_VOLUME = 50.0
+
+
+def get_ordered(worklist, rows=8, positions=None, channels=8):
+    '''Orders Worklist to minimise robot time: transfers of each liquid are
+    grouped into multi-dispense aspirations from each pass of the head over
+    a source column, with destinations ordered by head pass and channel so
+    that a multichannel head dispenses down a column, drawing from
+    channel-matched source wells in parallel where a liquid is replicated
+    down a column, and liquids visited in source plate order. positions
+    optionally map well indices to column-major plate wells.'''
+    pitch = get_pitch(rows, channels)
+    src_plates = worklist.src_plates.tolist()
+    src_wells = worklist.src_wells.tolist()
+    comps = worklist.comps.tolist()
+    dest_plates = worklist.dest_plates.tolist()
+    src_heads = [_get_head(well, rows, pitch, channels)
+                 for well in _get_positions(worklist.src_wells, positions)]
+    dest_heads = [_get_head(well, rows, pitch, channels)
+                  for well in _get_positions(worklist.dest_wells, positions)]
+    first_well = {}
+
+    for key, src_well in zip(zip(src_plates, comps), src_wells):
+        first_well[key] = min(first_well.get(key, src_well), src_well)
+
+    return worklist.take(sorted(
+        range(len(worklist)),
+        key=lambda idx: (src_plates[idx],
+                         first_well[src_plates[idx], comps[idx]],
+                         comps[idx],
+                         src_heads[idx][0],
+                         dest_plates[idx],
+                         dest_heads[idx],
+                         src_wells[idx])))
+
+
+def get_time(worklist, rows=8, positions=None, channels=8):
+    '''Estimates robot time (s) of executing Worklist in order, positions
+    optionally mapping its well indices to column-major plate wells.
+    Channels aspirate in parallel from a source column, and dispense in
+    parallel down a destination column, each reaching every pitch-th row.'''
+    pitch = get_pitch(rows, channels)
+
+    total = 0.0
+    pos = None
+    liquid = None
+    aspirated = None
+    tip_vol = 0.0
+    dispensing = None
+    used = set()
+
+    for dest_plate, dest_well, src_plate, src_well, vol, comp in zip(
+            worklist.dest_plates.tolist(),
+            _get_positions(worklist.dest_wells, positions),
+            worklist.src_plates.tolist(),
+            _get_positions(worklist.src_wells, positions),
+            worklist.vols.tolist(), worklist.comps.tolist()):
+        if liquid != (src_plate, comp):
+            liquid = src_plate, comp
+            aspirated = None
+            total += _TIP_CHANGE
+
+        src_pass, src_channel = _get_head(src_well, rows, pitch, channels)
+        dest_pass, channel = _get_head(dest_well, rows, pitch, channels)
+
+        # Channel-matched source is aspirated by the dispensing channel:
+        parallel = src_channel == channel
+
+        if aspirated != (src_plate, src_pass) or \
+                (not parallel and tip_vol < vol):
+            aspirated = src_plate, src_pass
+            total += _get_move(pos, (src_plate, src_well), rows) + _ASPIRATE
+            pos = src_plate, src_well
+            tip_vol = max(_TIP_VOLUME, vol)
+            dispensing = None
+
+        if dispensing != (dest_plate, dest_pass) or channel in used:
+            dispensing = dest_plate, dest_pass
+            total += _get_move(pos, (dest_plate, dest_well), rows) + \
+                _DISPENSE
+            pos = dest_plate, dest_well
+            used = set()
+
+        used.add(channel)
+
+        if not parallel:
+            tip_vol -= vol
+
+    return total
+
+
+def _get_positions(wells, positions):
+    '''Gets column-major plate wells of well indices.'''
+    return (wells if positions is None else positions[wells]).tolist()
+
+
+def _get_head(well, rows, pitch, channels):
+    '''Gets head pass, as (column, row offset, pass down column), and
+    channel reaching column-major well.'''
+    row = well % rows
+    idx = row // pitch
+
+    return (well // rows, row % pitch, idx // channels), idx % channels
+
+
+def _get_move(pos, new_pos, rows):
+    '''Estimates head travel time between (plate, well) positions.'''
+    if pos is None or pos[0] != new_pos[0]:
+        return _PLATE_MOVE
+
+    return _WELL_MOVE * (abs(pos[1] // rows - new_pos[1] // rows) +
+                         abs(pos[1] % rows - new_pos[1] % rows))
@@ -0,0 +1,92 @@
+'''
+lcr (c) University of Manchester 2018
+
+lcr is licensed under the MIT License.
+
+To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
+
+@author:  neilswainston
+'''
+import json
+from multiprocessing import Pool
+import os
+import sys
+import traceback
+
+from lcr_utils.assembly import AssemblyThread
+from lcr_utils.lcr import LCR
+from lcr_utils.phospho_lcr import PHOSPHO_LCR
+
+
+PROTOCOLS = {'lcr': LCR, 'phospho_lcr': PHOSPHO_LCR}
+
+
+def run_jobs(batch, outdir='assembly', num_processes=None):
+    '''Runs a batch of independent assembly jobs on a process pool, each
+    writing to its own output directory under outdir.
+
+    batch is a dict of query parameters shared by all jobs (e.g. ice,
+    cache, defaulting to the persistent entry cache) and jobs, a list of
+    per-job query parameters, each with a name and a protocol (a name in
+    PROTOCOLS, or a protocol dict).'''
+    names = [job['name'] for job in batch['jobs']]
+
+    if len(set(names)) != len(names):
+        raise ValueError('Job names must be unique: %s' % names)
+
+    shared = {key: value for key, value in batch.iteritems()
+              if key != 'jobs'}
+
+    # Workers share one persistent entry cache unless the batch sets one:
+    shared.setdefault('cache', {})
+
+    if not os.path.exists(outdir):
+        os.makedirs(outdir)
+
+    pool = Pool(num_processes)
+
+    try:
+        return pool.map(_run_job,
+                        [(dict(shared, **job),
+                          os.path.join(outdir, job['name']))
+                         for job in batch['jobs']])
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _run_job(args):
+    '''Runs a single job in a worker process.'''
+    query, job_outdir = args
+    result = {'name': query['name'], 'outdir': job_outdir}
+
+    try:
+        protocol = query['protocol']
+
+        AssemblyThread(query, job_outdir,
+                       PROTOCOLS[protocol]
+                       if isinstance(protocol, basestring)
+                       else protocol).run()
+    except Exception:  # pylint: disable=broad-except
+        # Report failure, leaving other jobs in the batch running:
+        result['error'] = traceback.format_exc()
+
+    return result
+
+
+def main(args):
+    '''main method.'''
+    with open(args[0]) as batch_file:
+        batch = json.load(batch_file)
+
+    results = run_jobs(batch,
+                       args[1] if len(args) > 1 else 'assembly',
+                       int(args[2]) if len(args) > 2 else None)
+
+    for result in results:
+        print('%s\t%s' % (result['name'],
+                          result.get('error', result['outdir'])))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
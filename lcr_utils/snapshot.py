@@ -0,0 +1,57 @@
+'''
+lcr (c) University of Manchester 2018
+
+lcr is licensed under the MIT License.
+
+To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
+
+@author:  neilswainston
+'''
+import gzip
+import json
+import os
+import tempfile
+
+
+_VERSION = 1
+
+
+def write(filename, ice_ids, parts, seqs=None):
+    '''Writes design snapshot of plasmid ice_ids, Parts of plasmids and their
+    linked parts, and optional sequences, as gzipped JSON.'''
+    snapshot = {'version': _VERSION,
+                'ice_ids': list(ice_ids),
+                'parts': {part.part_id: [part.name, part.typ, part.subtype,
+                                         part.desc, list(part.linked_parts)]
+                          for part in parts},
+                'seqs': seqs or {}}
+
+    fd, tmp_filename = tempfile.mkstemp(
+        prefix='.' + os.path.basename(filename), suffix='.tmp',
+        dir=os.path.dirname(os.path.abspath(filename)))
+
+    try:
+        with os.fdopen(fd, 'wb') as out_file:
+            # Zero mtime, so that identical designs give identical files:
+            gzip_file = gzip.GzipFile(fileobj=out_file, mode='wb', mtime=0)
+            json.dump(snapshot, gzip_file, sort_keys=True,
+                      separators=(',', ':'))
+            gzip_file.close()
+
+        os.rename(tmp_filename, filename)
+    except BaseException:
+        os.remove(tmp_filename)
+        raise
+
+
+def read(filename):
+    '''Reads design snapshot, as a dict of ice_ids, parts and seqs.'''
+    with gzip.open(filename, 'rb') as in_file:
+        snapshot = json.load(in_file)
+
+    if snapshot.get('version') != _VERSION:
+        raise ValueError('Unsupported snapshot version %s in %s' %
+                         (snapshot.get('version'), filename))
+
+    return snapshot
+
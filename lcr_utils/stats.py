@@ -0,0 +1,101 @@
+'''
+lcr (c) University of Manchester 2018
+
+lcr is licensed under the MIT License.
+
+To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
+
+@author:  neilswainston
+'''
+from _collections import defaultdict
+from bisect import bisect_left
+from contextlib import contextmanager
+import threading
+import time
+
+
+# Upper bounds (ms) of ICE request latency histogram buckets:
+_LATENCY_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+class JobStats(object):
+    '''Collects per-stage timings, ICE request, cache and worklist row
+    counts for a job, reporting progress through a JobThread listener.'''
+
+    def __init__(self, fire_event):
+        self.__fire_event = fire_event
+        self.__lock = threading.Lock()
+        self.__stages = {}
+        self.__latencies = [0] * (len(_LATENCY_BUCKETS) + 1)
+        self.__latency_total = 0.0
+        self.__cache = {'hits': 0, 'misses': 0}
+        self.__rows = defaultdict(int)
+        self.__robot_times = defaultdict(lambda: [0.0, 0.0])
+
+    @contextmanager
+    def stage(self, name):
+        '''Times a stage, firing a progress event on its completion.'''
+        start = time.time()
+
+        yield
+
+        duration = time.time() - start
+
+        with self.__lock:
+            stage = self.__stages.setdefault(name,
+                                             {'count': 0, 'duration': 0.0})
+            stage['count'] += 1
+            stage['duration'] += duration
+
+        self.__fire_event({'update': {'status': 'running',
+                                      'message': name,
+                                      'duration': duration}})
+
+    def add_request(self, latency):
+        '''Records an ICE request of given latency (seconds).'''
+        with self.__lock:
+            self.__latencies[bisect_left(_LATENCY_BUCKETS,
+                                         latency * 1000)] += 1
+            self.__latency_total += latency
+
+    def add_cache(self, hit):
+        '''Records a persistent cache hit or miss.'''
+        with self.__lock:
+            self.__cache['hits' if hit else 'misses'] += 1
+
+    def add_rows(self, name, num_rows):
+        '''Records rows written to named output.'''
+        with self.__lock:
+            self.__rows[name] += num_rows
+
+    def add_robot_time(self, name, before, after):
+        '''Records estimated robot seconds of named output before and after
+        optimised ordering.'''
+        with self.__lock:
+            self.__robot_times[name][0] += before
+            self.__robot_times[name][1] += after
+
+    def get_summary(self):
+        '''Gets machine-readable summary.'''
+        with self.__lock:
+            num_requests = sum(self.__latencies)
+            num_lookups = sum(self.__cache.values())
+
+            return {
+                'stages': dict(self.__stages),
+                'ice': {
+                    'requests': num_requests,
+                    'mean_latency': self.__latency_total / num_requests
+                    if num_requests else 0.0,
+                    'latency_histogram_ms': dict(zip(
+                        ['<=%d' % bound for bound in _LATENCY_BUCKETS] +
+                        ['>%d' % _LATENCY_BUCKETS[-1]],
+                        self.__latencies))},
+                'cache': dict(self.__cache,
+                              hit_rate=float(self.__cache['hits']) /
+                              num_lookups if num_lookups else 0.0),
+                'rows': dict(self.__rows),
+                'robot_seconds': {name: {'round_robin': times[0],
+                                         'optimised': times[1]}
+                                  for name, times
+                                  in self.__robot_times.iteritems()}}
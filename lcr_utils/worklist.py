@@ -0,0 +1,86 @@
+'''
+lcr (c) University of Manchester 2018
+
+lcr is licensed under the MIT License.
+
+To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
+
+@author:  neilswainston
+'''
+import numpy as np
+
+
+COLS = ['DestinationPlateBarcode',
+        'DestinationPlateWell',
+        'SourcePlateBarcode',
+        'SourcePlateWell',
+        'Volume',
+        'ComponentName',
+        'description',
+        'ice_id',
+        'plasmid_id']
+
+
+class Worklist(object):
+    '''Columnar worklist of transfers, holding well indices as integers,
+    volumes as floats and names as interned strings.'''
+    __slots__ = ['dest_plates', 'dest_wells', 'src_plates', 'src_wells',
+                 'vols', 'comps', 'descs', 'ice_ids', 'plasmid_ids']
+
+    def __init__(self, dest_plates, dest_wells, src_plates, src_wells, vols,
+                 comps, descs, ice_ids, plasmid_ids):
+        self.dest_plates = _get_names(dest_plates)
+        self.dest_wells = np.asarray(dest_wells, dtype=int)
+        self.src_plates = _get_names(src_plates)
+        self.src_wells = np.asarray(src_wells, dtype=int)
+        self.vols = np.asarray(vols, dtype=float)
+        self.comps = _get_names(comps)
+        self.descs = _get_names(descs)
+        self.ice_ids = _get_names(ice_ids)
+        self.plasmid_ids = _get_names(plasmid_ids)
+
+    def __len__(self):
+        return len(self.vols)
+
+    def take(self, indices):
+        '''Gets worklist of transfers at indices, in order.'''
+        return Worklist(*[getattr(self, col)[indices]
+                          for col in self.__slots__])
+
+    def get_rows(self, well_names):
+        '''Gets rows of strings for csv output, formatting each distinct
+        well and volume once.'''
+        vols, vol_idxs = np.unique(self.vols, return_inverse=True)
+        vol_names = np.array([str(float(vol)) for vol in vols],
+                             dtype=object)
+
+        return zip(self.dest_plates,
+                   well_names[self.dest_wells],
+                   self.src_plates,
+                   well_names[self.src_wells],
+                   vol_names[vol_idxs],
+                   self.comps,
+                   self.descs,
+                   self.ice_ids,
+                   self.plasmid_ids)
+
+    def get_table(self, well_names):
+        '''Gets typed columns, as (name, values) pairs, for tabular
+        output.'''
+        return zip(COLS, [self.dest_plates,
+                          well_names[self.dest_wells],
+                          self.src_plates,
+                          well_names[self.src_wells],
+                          self.vols,
+                          self.comps,
+                          self.descs,
+                          self.ice_ids,
+                          self.plasmid_ids])
+
+
+def _get_names(values):
+    '''Gets values as an array of interned strings.'''
+    if isinstance(values, np.ndarray) and values.dtype == object:
+        return values
+
+    return np.array([intern(str(value)) for value in values], dtype=object)
@@ -0,0 +1,40 @@
+'''
+lcr (c) University of Manchester 2018
+
+lcr is licensed under the MIT License.
+
+To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
+
+@author:  neilswainston
+'''
+# pylint: disable=invalid-name
+from functools import partial
+from shutil import rmtree
+import tempfile
+import unittest
+
+from lcr_utils import benchmark, build
+
+
+class FakeICETestCase(unittest.TestCase):
+    '''Base test class, serving a synthetic design from a fake ICE server
+    in place of ICEClient.'''
+
+    def setUp(self):
+        self.entries, self.ice_ids = benchmark.get_design(
+            12, num_orfs=8, num_dominoes=16, seq_len=100)
+        self.client = benchmark.FakeICEClient(self.entries, 0)
+        self.__ice_client = build.ICEClient
+        build.ICEClient = partial(benchmark.get_client, self.client)
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        build.ICEClient = self.__ice_client
+        rmtree(self.tmp_dir)
+
+    def get_query(self, **params):
+        '''Gets query of fake ICE server and design, updated with params.'''
+        query = {'ice': {'url': 'fake', 'username': '', 'password': ''},
+                 'ice_ids': self.ice_ids}
+        query.update(params)
+        return query
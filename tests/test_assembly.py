@@ -0,0 +1,255 @@
+'''
+lcr (c) University of Manchester 2018
+
+lcr is licensed under the MIT License.
+
+To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
+
+@author:  neilswainston
+'''
+# pylint: disable=invalid-name
+# pylint: disable=protected-access
+from _collections import defaultdict
+import csv
+from itertools import cycle
+import json
+import os
+import random
+import unittest
+
+from lcr_utils import assembly
+from lcr_utils.lcr import LcrThread
+from lcr_utils.worklist import Worklist
+from tests import FakeICETestCase
+
+
+class TestRoundRobin(unittest.TestCase):
+    '''Test class for round-robin worklist ordering.'''
+
+    def test_round_robin(self):
+        '''Tests _round_robin against original cycling writer.'''
+        rand = random.Random(0)
+
+        for _ in range(100):
+            worklist = _get_worklist(rand, rand.randint(1, 300),
+                                     rand.randint(1, 96))
+
+            self.assertEqual(
+                assembly._round_robin(worklist).comps.tolist(),
+                [worklist.comps[idx] for idx in _cycle_order(worklist)])
+
+    def test_round_robin_empty(self):
+        '''Tests _round_robin of empty worklist.'''
+        self.assertEqual(len(assembly._round_robin(
+            _get_worklist(random.Random(0), 0, 1))), 0)
+
+
+class TestSplit(unittest.TestCase):
+    '''Test class for splitting transfers over source wells.'''
+
+    def test_split(self):
+        '''Tests _split of transfers exceeding well capacity.'''
+        kind, constructs, comps, vols = assembly._split(
+            ('water', [0, 1, 2], ['a', 'b', 'c'], [243.0, 50.0, 380.0]), 190)
+
+        self.assertEqual(kind, 'water')
+        self.assertEqual(constructs.tolist(), [0, 0, 1, 2, 2])
+        self.assertEqual(comps, ['a', 'a', 'b', 'c', 'c'])
+        self.assertEqual(vols.tolist(), [190.0, 53.0, 50.0, 190.0, 190.0])
+
+    def test_split_pools(self):
+        '''Tests _split leaves pools unsplit.'''
+        block = ('pools', [0], ['domino_pool'], [243.0])
+        self.assertEqual(assembly._split(block, 190), block)
+
+
+class TestAssemblyThread(FakeICETestCase):
+    '''Test class for AssemblyThread, run against a fake ICE server.'''
+
+    def test_run(self):
+        '''Tests run, each plasmid and entry being fetched once.'''
+        self.__run()
+
+        rows = _read_csv(os.path.join(self.tmp_dir, 'lcr_worklist.csv'))
+        dests = defaultdict(set)
+
+        for row in rows:
+            dests[row['plasmid_id']].add(row['DestinationPlateWell'])
+
+        self.assertEqual(sorted(dests), self.ice_ids)
+        self.assertTrue(all(len(wells) == 1 for wells in dests.values()))
+
+        # Plasmids, their backbones, ORFs and dominoes:
+        num_entries = len(self.ice_ids) + \
+            len({row['ice_id'] for row in rows if row['ice_id']}) + \
+            len({row['ice_id']
+                 for row in _read_csv(os.path.join(
+                     self.tmp_dir, 'domino_pools_worklist.csv'))
+                 if row['ice_id']})
+
+        self.assertEqual(self.client.get_num_requests(), num_entries)
+
+    def test_run_well_volume(self):
+        '''Tests run with well capacity, no source well being overdrawn.'''
+        self.__run(well_volume=200, dead_volume=10)
+
+        draws = defaultdict(float)
+
+        for step_id in ['domino_pools', 'lcr']:
+            for row in _read_csv(os.path.join(self.tmp_dir,
+                                              step_id + '_worklist.csv')):
+                if row['SourcePlateBarcode'] != 'domino_pools':
+                    draws[row['SourcePlateBarcode'],
+                          row['SourcePlateWell']] += float(row['Volume'])
+
+        self.assertEqual(max(draws.values()), 190)
+
+    def test_run_replicate(self):
+        '''Tests replicated components take a well per channel.'''
+        self.__run(plate_format=384, replicate=5)
+
+        with open(os.path.join(self.tmp_dir, 'MastermixTrough.csv')) \
+                as in_file:
+            wells = [row[0] for row in csv.reader(in_file)
+                     if row[1] == 'lgr-mastermix']
+
+        # Water fills column 1; replicas start at the top of column 2:
+        self.assertEqual(wells, ['A2', 'C2', 'E2', 'G2', 'I2', 'K2', 'M2',
+                                 'O2'])
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir,
+                                                     'components_2.csv')))
+
+    def test_run_stream(self):
+        '''Tests streamed chunks leave room for reagents beside water.'''
+        self.__run(stream=True, rows=2, cols=4)
+
+        # 12 constructs in chunks of 7, 8 wells less lgr-mastermix:
+        self.assertEqual(sorted(filename
+                                for filename in os.listdir(self.tmp_dir)
+                                if filename.startswith('MastermixTrough')),
+                         ['MastermixTrough_1.csv', 'MastermixTrough_2.csv'])
+
+    def test_run_incremental(self):
+        '''Tests first incremental run clears outputs of previous runs.'''
+        self.__run()
+        stale = os.path.join(self.tmp_dir, 'stale.csv')
+        open(stale, 'w').close()
+
+        self.__run(incremental=True)
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir,
+                                                    'lcr_worklist.csv')))
+
+    def test_run_incremental_layout(self):
+        '''Tests incremental run keeps the normal plate layout, sharding
+        over plates rather than chunking.'''
+        self.__run(rows=2, cols=4)
+        expected = _read_outputs(self.tmp_dir)
+
+        self.__run(incremental=True, rows=2, cols=4)
+        outputs = _read_outputs(self.tmp_dir)
+        del outputs['manifest.json']
+
+        self.assertEqual(outputs, expected)
+
+    def test_run_incremental_unchanged_files(self):
+        '''Tests incremental run rewrites only changed files.'''
+        self.__run(incremental=True)
+        inodes = _get_inodes(self.tmp_dir)
+
+        # Swap a domino, leaving part counts, so volumes, unchanged:
+        metadata = json.loads(self.entries[self.ice_ids[0]][0])
+        dominoes = [part['partId'] for part in metadata['linkedParts']
+                    if part['partId'].startswith('DOM')]
+        metadata['linkedParts'].append(
+            {'partId': sorted(set('DOM%06d' % idx for idx in range(16)) -
+                              set(dominoes))[0]})
+        metadata['linkedParts'] = [part for part in metadata['linkedParts']
+                                   if part['partId'] != dominoes[0]]
+        self.entries[self.ice_ids[0]] = json.dumps(metadata), ''
+        self.__run(incremental=True)
+
+        changed = sorted(filename
+                         for filename, inode
+                         in _get_inodes(self.tmp_dir).iteritems()
+                         if inodes.get(filename) != inode)
+
+        self.assertIn('domino_pools_worklist.csv', changed)
+        self.assertNotIn('MastermixTrough.csv', changed)
+        self.assertNotIn('lcr_worklist.csv', changed)
+
+    def test_run_incremental_seqs(self):
+        '''Tests incremental run regenerates outputs if a sequence
+        changes.'''
+        self.__run(incremental=True, seqs=True)
+
+        metadata, seq = self.entries['ORF000000']
+        self.entries['ORF000000'] = metadata, seq[::-1]
+        self.__run(incremental=True, seqs=True)
+
+        with open(os.path.join(self.tmp_dir, 'components.csv')) \
+                as in_file:
+            self.assertIn(seq[::-1], in_file.read())
+
+    def __run(self, **params):
+        '''Runs LcrThread over the fake ICE server.'''
+        LcrThread(self.get_query(**params), self.tmp_dir).run()
+
+
+def _get_worklist(rand, size, num_dests):
+    '''Gets random Worklist.'''
+    return Worklist(['lcr'] * size,
+                    [rand.randrange(num_dests) for _ in range(size)],
+                    ['components'] * size,
+                    [rand.randrange(20) for _ in range(size)],
+                    [1.0] * size,
+                    ['comp%d' % idx for idx in range(size)],
+                    [''] * size, [''] * size, [''] * size)
+
+
+def _cycle_order(worklist):
+    '''Gets order of original writer, cycling through destination wells and
+    popping each destination's transfers in source well order.'''
+    worklist_map = defaultdict(list)
+    order = []
+
+    for idx in sorted(range(len(worklist)),
+                      key=lambda idx: worklist.src_wells[idx]):
+        worklist_map[worklist.dest_wells[idx]].append(idx)
+
+    for idx in cycle(range(0, worklist.dest_wells.max() + 1)):
+        if worklist_map[idx]:
+            order.append(worklist_map[idx].pop(0))
+
+        if not sum([len(lst) for lst in worklist_map.values()]):
+            break
+
+    return order
+
+
+def _read_outputs(outdir):
+    '''Reads output files, other than summary, by filename.'''
+    outputs = {}
+
+    for filename in os.listdir(outdir):
+        if filename != 'summary.json':
+            with open(os.path.join(outdir, filename)) as in_file:
+                outputs[filename] = in_file.read()
+
+    return outputs
+
+
+def _get_inodes(outdir):
+    '''Gets inode of each output file, changed whenever it is published.'''
+    return {filename: os.stat(os.path.join(outdir, filename)).st_ino
+            for filename in os.listdir(outdir)}
+
+
+def _read_csv(filename):
+    '''Reads csv file as list of dicts.'''
+    with open(filename) as in_file:
+        return list(csv.DictReader(in_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
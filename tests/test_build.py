@@ -0,0 +1,58 @@
+'''
+lcr (c) University of Manchester 2018
+
+lcr is licensed under the MIT License.
+
+To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
+
+@author:  neilswainston
+'''
+# pylint: disable=invalid-name
+# pylint: disable=protected-access
+import json
+import os
+import unittest
+
+from lcr_utils import build
+from tests import FakeICETestCase
+
+
+class TestBuildGenieBase(FakeICETestCase):
+    '''Test class for BuildGenieBase, run against a fake ICE server.'''
+
+    def test_get_order_cache(self):
+        '''Tests cached parts are reused, but plasmids are refetched.'''
+        order = self.__get_order()
+        num_requests = self.client.get_num_requests()
+
+        self.assertEqual(self.__get_order(), order)
+        self.assertEqual(self.client.get_num_requests() - num_requests,
+                         len(self.ice_ids))
+
+    def test_get_order_cache_edited(self):
+        '''Tests edits to a plasmid's linked parts are seen when cached.'''
+        self.__get_order()
+
+        metadata = json.loads(self.entries[self.ice_ids[0]][0])
+        metadata['linkedParts'].append({'partId': 'ORF000000'})
+        metadata['linkedParts'].append({'partId': 'ORF000001'})
+        self.entries[self.ice_ids[0]] = json.dumps(metadata), ''
+
+        pools = build.BuildGenieBase(self.__get_query())._get_graph() \
+            .get_pools()
+
+        self.assertTrue({'ORF000000', 'ORF000001'}.issubset(
+            part.part_id for part in pools[self.ice_ids[0]]['parts']))
+
+    def __get_order(self):
+        '''Gets order.'''
+        return build.BuildGenieBase(self.__get_query()).get_order()
+
+    def __get_query(self):
+        '''Gets query, with persistent cache.'''
+        return self.get_query(
+            cache={'path': os.path.join(self.tmp_dir, 'cache.db')})
+
+
+if __name__ == '__main__':
+    unittest.main()
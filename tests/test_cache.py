@@ -0,0 +1,64 @@
+'''
+lcr (c) University of Manchester 2018
+
+lcr is licensed under the MIT License.
+
+To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
+
+@author:  neilswainston
+'''
+# pylint: disable=invalid-name
+import os
+from shutil import rmtree
+import tempfile
+import time
+import unittest
+
+from lcr_utils.cache import EntryCache
+
+
+class TestEntryCache(unittest.TestCase):
+    '''Test class for EntryCache.'''
+
+    def setUp(self):
+        self.__dir = tempfile.mkdtemp()
+        self.__path = os.path.join(self.__dir, 'cache.db')
+
+    def tearDown(self):
+        rmtree(self.__dir)
+
+    def test_get(self):
+        '''Tests get of missing, current and out of date entries.'''
+        cache = EntryCache(self.__path)
+        cache.put('P1', {'seq': 'ACGT'}, 'v1')
+
+        self.assertIsNone(cache.get('P2'))
+        self.assertEqual(cache.get('P1', 'v1'), {'seq': 'ACGT'})
+        self.assertIsNone(cache.get('P1', 'v2'))
+        cache.close()
+
+    def test_evict(self):
+        '''Tests least recently used entries are evicted once full, and
+        access times persist between instances.'''
+        cache = EntryCache(self.__path, max_entries=20)
+
+        for idx in range(20):
+            cache.put('P%d' % idx, idx)
+
+        # Accessing P0 makes P1 least recently used:
+        time.sleep(0.01)
+        cache.get('P0')
+        cache.close()
+
+        cache = EntryCache(self.__path, max_entries=20)
+        cache.put('P20', 20)
+
+        self.assertEqual(cache.get('P0'), 0)
+        self.assertIsNone(cache.get('P1'))
+        self.assertEqual(sum(cache.get('P%d' % idx) is not None
+                             for idx in range(21)), 18)
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
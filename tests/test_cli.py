@@ -0,0 +1,88 @@
+'''
+lcr (c) University of Manchester 2018
+
+lcr is licensed under the MIT License.
+
+To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
+
+@author:  neilswainston
+'''
+# pylint: disable=invalid-name
+# pylint: disable=protected-access
+import json
+import os
+from StringIO import StringIO
+import sys
+import unittest
+
+from lcr_utils import cli
+from tests import FakeICETestCase
+
+
+class TestCli(FakeICETestCase):
+    '''Test class for cli, run against a fake ICE server.'''
+
+    def setUp(self):
+        FakeICETestCase.setUp(self)
+        self.__stdin = sys.stdin
+
+    def tearDown(self):
+        sys.stdin = self.__stdin
+        FakeICETestCase.tearDown(self)
+
+    def test_read_manifest_ice_ids_file(self):
+        '''Tests read_manifest reads ice_ids from file.'''
+        filename = os.path.join(self.tmp_dir, 'ice_ids.txt')
+
+        with open(filename, 'w') as out_file:
+            out_file.write('\n'.join(self.ice_ids) + '\n\n')
+
+        manifest = cli.read_manifest(StringIO(json.dumps(
+            {'ice': {}, 'ice_ids': filename})))
+
+        self.assertEqual(manifest['ice_ids'], self.ice_ids)
+        self.assertEqual(manifest['protocols'], ['lcr'])
+
+    def test_read_manifest_stdin(self):
+        '''Tests read_manifest rejects manifest and ice_ids both from
+        stdin.'''
+        sys.stdin = StringIO(json.dumps({'ice': {}, 'ice_ids': '-'}))
+        self.assertRaises(ValueError, cli.read_manifest, sys.stdin)
+
+    def test_read_manifest_empty(self):
+        '''Tests read_manifest rejects empty ice_ids.'''
+        sys.stdin = StringIO('\n')
+        self.assertRaises(ValueError, cli.read_manifest,
+                          StringIO(json.dumps({'ice': {}, 'ice_ids': '-'})))
+
+    def test_read_manifest_protocol(self):
+        '''Tests read_manifest rejects unknown protocols.'''
+        self.assertRaises(ValueError, cli.read_manifest,
+                          StringIO(json.dumps({'snapshot': 'design.json.gz',
+                                               'protocols': ['unknown']})))
+
+    def test_run(self):
+        '''Tests run resolves design once for several protocols, and
+        validates dominoes from its snapshot.'''
+        outdir = os.path.join(self.tmp_dir, 'out')
+        outdirs = cli.run(self.get_query(protocols=['lcr', 'phospho_lcr'],
+                                         validate={}), outdir)
+
+        self.assertEqual(sorted(outdirs), ['lcr', 'phospho_lcr'])
+
+        for protocol_outdir in outdirs.values():
+            self.assertTrue(os.path.exists(
+                os.path.join(protocol_outdir, 'domino_validation.csv')))
+
+        # Each plasmid and part, then sequence only of each part:
+        num_parts = len({part['partId']
+                         for ice_id in self.ice_ids
+                         for part in json.loads(self.entries[ice_id][0])
+                         ['linkedParts']})
+
+        self.assertEqual(self.client.get_num_requests(),
+                         len(self.ice_ids) + 2 * num_parts)
+
+
+if __name__ == '__main__':
+    unittest.main()
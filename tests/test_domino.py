@@ -0,0 +1,88 @@
+'''
+lcr (c) University of Manchester 2018
+
+lcr is licensed under the MIT License.
+
+To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
+
+@author:  neilswainston
+'''
+# pylint: disable=invalid-name
+import random
+import unittest
+
+from synbiochem.utils.seq_utils import get_melting_temp
+
+from lcr_utils import domino
+from lcr_utils.build import Part
+
+
+class TestDomino(unittest.TestCase):
+    '''Test class for domino.'''
+
+    def setUp(self):
+        rand = random.Random(0)
+        self.__seqs = {part_id: ''.join(rand.choice('ACGT')
+                                        for _ in range(200))
+                       for part_id in ['BB', 'ORF']}
+
+        bb_seq = self.__seqs['BB']
+        orf_seq = self.__seqs['ORF']
+        self.__seqs['DOM1'] = bb_seq[-24:] + orf_seq[:24]
+        self.__seqs['DOM2'] = orf_seq[-24:] + bb_seq[:24]
+        self.__seqs['DOM3'] = ''.join(rand.choice('ACGT') for _ in range(48))
+
+        self.__pools = {'PL': {'backbone': [_get_part('BB', 'PLASMID')],
+                               'parts': [_get_part('ORF', 'ORF')],
+                               'dominoes': [_get_part('DOM1', 'DOMINO'),
+                                            _get_part('DOM2', 'DOMINO'),
+                                            _get_part('DOM3', 'DOMINO'),
+                                            _get_part('DOM4', 'DOMINO')]}}
+
+    def test_get_melting_temps(self):
+        '''Tests get_melting_temps against synbiochem.'''
+        seqs = [self.__seqs['DOM1'][:24], self.__seqs['DOM2'][24:]]
+        reag_concs = dict(domino._REAG_CONCS)  # pylint: disable=W0212
+
+        for seq, temp in zip(seqs, domino.get_melting_temps(seqs)):
+            # get_melting_temp updates reagent concentrations passed:
+            self.assertAlmostEqual(
+                temp, get_melting_temp(seq, None, dict(reag_concs)), 6)
+
+    def test_get_melting_temps_unicode(self):
+        '''Tests get_melting_temps on unicode sequences.'''
+        seqs = [self.__seqs['DOM1'][:24], self.__seqs['DOM3'][:14]]
+
+        self.assertEqual(
+            domino.get_melting_temps([unicode(seq) for seq in seqs]).tolist(),
+            domino.get_melting_temps(seqs).tolist())
+
+    def test_validate(self):
+        '''Tests validate.'''
+        report = domino.validate(['PL'], self.__pools, self.__seqs,
+                                 min_tm=0, max_tm=100)
+
+        self.assertEqual([entry[:4] for entry in report],
+                         [['PL', 'DOM1', 'BB', 'ORF'],
+                          ['PL', 'DOM2', 'ORF', 'BB'],
+                          ['PL', 'DOM3', None, None],
+                          ['PL', 'DOM4', None, None]])
+        self.assertEqual([entry[-1] for entry in report],
+                         ['', '', 'no_junction', 'no_sequence'])
+
+    def test_validate_unicode(self):
+        '''Tests validate on unicode sequences, as read from snapshots.'''
+        seqs = {part_id: unicode(seq.lower())
+                for part_id, seq in self.__seqs.iteritems()}
+
+        self.assertEqual(domino.validate(['PL'], self.__pools, seqs),
+                         domino.validate(['PL'], self.__pools, self.__seqs))
+
+
+def _get_part(part_id, subtype):
+    '''Gets Part.'''
+    return Part(part_id, part_id, 'PART', subtype, part_id, ())
+
+
+if __name__ == '__main__':
+    unittest.main()
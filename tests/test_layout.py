@@ -0,0 +1,54 @@
+'''
+lcr (c) University of Manchester 2018
+
+lcr is licensed under the MIT License.
+
+To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
+
+@author:  neilswainston
+'''
+# pylint: disable=invalid-name
+import unittest
+
+from lcr_utils.layout import PlateLayout, get_pitch
+
+
+class TestLayout(unittest.TestCase):
+    '''Test class for layout.'''
+
+    def test_get_pitch(self):
+        '''Tests get_pitch.'''
+        self.assertEqual([get_pitch(rows, 8) for rows in [8, 16, 32]],
+                         [1, 2, 4])
+        self.assertEqual(get_pitch(16, 1), 1)
+        self.assertEqual(get_pitch(16, 6), 1)
+
+    def test_get_well_names(self):
+        '''Tests get_well_names.'''
+        self.assertEqual(PlateLayout().get_well_names()[:10].tolist(),
+                         ['A1', 'B1', 'C1', 'D1', 'E1', 'F1', 'G1', 'H1',
+                          'A2', 'B2'])
+        self.assertEqual(PlateLayout(16, 24).get_well_names()[:10].tolist(),
+                         ['A1', 'C1', 'E1', 'G1', 'I1', 'K1', 'M1', 'O1',
+                          'B1', 'D1'])
+        self.assertEqual(PlateLayout(32, 48).get_well_names()[6:9].tolist(),
+                         ['Y1', 'AC1', 'B1'])
+
+    def test_get_well_names_single_channel(self):
+        '''Tests get_well_names fill rows in order for a single channel.'''
+        self.assertEqual(
+            PlateLayout(16, 24, 1).get_well_names()[:3].tolist(),
+            ['A1', 'B1', 'C1'])
+
+    def test_get_channel(self):
+        '''Tests get_channel.'''
+        layout = PlateLayout(16, 24)
+        self.assertEqual(layout.channels, 8)
+        self.assertEqual([layout.get_channel(idx) for idx in range(16)],
+                         range(8) * 2)
+        self.assertEqual(layout.get_channel(16 * 24 + 3), 3)
+        self.assertEqual(PlateLayout(8, 12, 4).get_channel(7), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
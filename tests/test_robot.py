@@ -0,0 +1,65 @@
+'''
+lcr (c) University of Manchester 2018
+
+lcr is licensed under the MIT License.
+
+To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
+
+@author:  neilswainston
+'''
+# pylint: disable=invalid-name
+import random
+import unittest
+
+import numpy as np
+
+from lcr_utils import robot
+from lcr_utils.layout import PlateLayout
+from lcr_utils.worklist import Worklist
+
+
+class TestRobot(unittest.TestCase):
+    '''Test class for robot.'''
+
+    def test_get_time_channels(self):
+        '''Tests get_time falls as channels dispense down a column.'''
+        worklist = _get_worklist(range(16), [0] * 16)
+        times = [robot.get_time(worklist, 16,
+                                PlateLayout(16, 1, channels).get_positions(),
+                                channels)
+                 for channels in [1, 4, 8]]
+
+        self.assertGreater(times[0], times[1])
+        self.assertGreater(times[1], times[2])
+
+    def test_get_time_parallel(self):
+        '''Tests replicas matched to channels aspirate in parallel.'''
+        replicated = _get_worklist(range(8), range(8), [20.0] * 8)
+        single = _get_worklist(range(8), [0] * 8, [20.0] * 8)
+
+        self.assertLess(robot.get_time(replicated), robot.get_time(single))
+
+    def test_get_ordered(self):
+        '''Tests get_ordered keeps transfers and cuts robot time.'''
+        rand = random.Random(0)
+        worklist = _get_worklist([rand.randrange(384) for _ in range(200)],
+                                 [rand.randrange(4) for _ in range(200)])
+        positions = np.arange(384)
+        ordered = robot.get_ordered(worklist, 16, positions)
+
+        self.assertEqual(sorted(zip(ordered.dest_wells, ordered.src_wells)),
+                         sorted(zip(worklist.dest_wells, worklist.src_wells)))
+        self.assertLess(robot.get_time(ordered, 16, positions),
+                        robot.get_time(worklist, 16, positions))
+
+
+def _get_worklist(dest_wells, src_wells, vols=None):
+    '''Gets Worklist of transfers of one component.'''
+    size = len(dest_wells)
+    return Worklist(['lcr'] * size, dest_wells, ['components'] * size,
+                    src_wells, vols or [1.0] * size, ['comp'] * size,
+                    [''] * size, [''] * size, [''] * size)
+
+
+if __name__ == '__main__':
+    unittest.main()
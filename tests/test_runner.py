@@ -0,0 +1,61 @@
+'''
+lcr (c) University of Manchester 2018
+
+lcr is licensed under the MIT License.
+
+To view a copy of this license, visit <http://opensource.org/licenses/MIT/>.
+
+@author:  neilswainston
+'''
+# pylint: disable=invalid-name
+# pylint: disable=protected-access
+from functools import partial
+import os
+import sqlite3
+import unittest
+
+from lcr_utils import build, cache, runner
+from tests import FakeICETestCase
+
+
+class TestRunner(FakeICETestCase):
+    '''Test class for runner, run against a fake ICE server.'''
+
+    def setUp(self):
+        FakeICETestCase.setUp(self)
+        self.__entry_cache = build.EntryCache
+        self.__cache_path = os.path.join(self.tmp_dir, 'cache.db')
+
+        # Forked workers inherit the fake ICE server and cache location:
+        build.EntryCache = partial(cache.EntryCache, self.__cache_path)
+
+    def tearDown(self):
+        build.EntryCache = self.__entry_cache
+        FakeICETestCase.tearDown(self)
+
+    def test_run_jobs(self):
+        '''Tests run_jobs, workers sharing the entry cache by default.'''
+        outdir = os.path.join(self.tmp_dir, 'out')
+        results = runner.run_jobs(
+            {'ice': {'url': 'fake', 'username': '', 'password': ''},
+             'jobs': [{'name': 'lcr', 'protocol': 'lcr',
+                       'ice_ids': self.ice_ids[:6]},
+                      {'name': 'phospho_lcr', 'protocol': 'phospho_lcr',
+                       'ice_ids': self.ice_ids[6:]}]},
+            outdir, 2)
+
+        self.assertEqual(results,
+                         [{'name': name, 'outdir': os.path.join(outdir, name)}
+                          for name in ['lcr', 'phospho_lcr']])
+
+        conn = sqlite3.connect(self.__cache_path)
+
+        try:
+            self.assertGreater(conn.execute('SELECT COUNT(*) FROM entry')
+                               .fetchone()[0], 0)
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()